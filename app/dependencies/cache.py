@@ -0,0 +1,565 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+from weakref import WeakKeyDictionary
+
+from cachetools import Cache, TTLCache
+
+# Downloaded feed bytes kept across all cached feeds before the least recently used are dropped.
+FEED_CACHE_MAX_BYTES = int(os.getenv('FEED_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into a single execution.
+
+    The first caller for a key runs the function, every caller that arrives
+    while it is still running waits and receives the same result (or error).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """Return ``(result, shared)``, ``shared`` is True for the waiters."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+
+class FeedResponse:
+    """What a feed fetch returns to :class:`FeedCache`.
+
+    ``body`` is the undecoded JSON and ``data`` decodes it on access, unless
+    the fetch passed already decoded ``data``. ``not_modified`` is set when
+    the upstream answered a conditional request with 304, in which case there
+    is no payload and the cached copy is kept.
+    """
+    __slots__ = ('_data', 'body', 'etag', 'last_modified', 'size', 'not_modified')
+
+    def __init__(self, data=None, etag=None, last_modified=None, size=0, not_modified=False, body=None):
+        self._data = data
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.not_modified = not_modified
+
+    @property
+    def data(self):
+        return self._data if self._data is not None or self.body is None else json.loads(self.body)
+
+
+class FeedEntry:
+    """A cached feed: its validators, parsed models and, until a model is parsed, its payload.
+
+    Pages read the parsed models, so the payload is released after the first
+    parse instead of pinning a decoded multi-megabyte feed for as long as
+    the entry is kept for revalidation.
+    """
+    __slots__ = ('_data', 'body', 'fetched_at', 'expires_at', 'etag', 'last_modified', 'size', 'version', 'models')
+
+    def __init__(self, data, fetched_at, expires_at, etag=None, last_modified=None, size=0, version=1, body=None):
+        self._data = data
+        self.body = body
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.version = version
+        # Parsed models of the payload keyed by parser, reused until the feed changes.
+        self.models = {}
+
+    @property
+    def data(self):
+        """The decoded JSON, decoded again on every access when only the body is kept."""
+        return self._data if self._data is not None or self.body is None else json.loads(self.body)
+
+    def raw(self):
+        """The undecoded JSON, for parsers that validate straight from bytes."""
+        return self.body if self.body is not None else json.dumps(self._data).encode()
+
+    def has_payload(self):
+        return self._data is not None or self.body is not None
+
+    def can_serve(self, parse=None):
+        """True if the entry has ``parse``'s model, or the payload to build it (or the raw JSON for None)."""
+        return parse in self.models or self.has_payload()
+
+    def release(self):
+        self._data = None
+        self.body = None
+
+    def validators(self):
+        """Headers for a conditional request that revalidates this entry."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class FeedCache:
+    """Process-wide store of upstream JSON feeds keyed by URL.
+
+    Every URL keeps its own TTL (the one the caller passes), concurrent misses
+    for the same URL are de-duplicated so only one upstream request is made,
+    and expired entries are kept around so they can be revalidated with a
+    conditional request, or still served if the refresh fails. The least
+    recently used entries are dropped once there are ``maxsize`` of them or
+    their downloaded sizes add up to ``max_bytes``.
+
+    ``fetch(validators)`` receives the conditional request headers for the
+    cached copy (empty on a miss, or when the entry no longer has the payload
+    a caller needs) and returns a :class:`FeedResponse`, the decoded JSON, or
+    None on failure.
+    """
+
+    COUNTERS = (
+        'hits', 'misses', 'stale', 'coalesced', 'fetches', 'errors', 'stale_served',
+        'not_modified', 'bytes_downloaded', 'bytes_saved', 'parses', 'parses_saved',
+    )
+
+    def __init__(self, maxsize=256, max_bytes=FEED_CACHE_MAX_BYTES, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._flight = SingleFlight()
+        self._async_calls = WeakKeyDictionary()
+        self._stats = {}
+
+    def _count(self, url, counter, amount=1):
+        with self._lock:
+            self._stats.setdefault(url, Counter())[counter] += amount
+
+    def _entry(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def _lookup(self, url, parse=None):
+        """Return ``(entry, fresh)`` and record a hit, miss or stale lookup."""
+        entry = self._entry(url)
+        if entry is not None and entry.expires_at > self._clock() and entry.can_serve(parse):
+            self._count(url, 'hits')
+            return entry, True
+        self._count(url, 'stale' if entry is not None else 'misses')
+        return entry, False
+
+    def get_entry(self, url, ttl_seconds, fetch, parse=None):
+        """Return the :class:`FeedEntry` for ``url``, refreshing it when it is missing or expired.
+
+        ``parse`` is the parser the caller will apply (None for the raw JSON);
+        an entry without its model or payload is downloaded again in full.
+        """
+        entry, fresh = self._lookup(url, parse)
+        if fresh:
+            return entry
+
+        full = entry is not None and not entry.can_serve(parse)
+        entry, shared = self._flight.do((url, full), lambda: self._refresh(url, ttl_seconds, fetch, parse))
+        if shared:
+            self._count(url, 'coalesced')
+        return entry
+
+    async def aget_entry(self, url, ttl_seconds, fetch, parse=None):
+        """Async version of :meth:`get_entry`, ``fetch()`` must return an awaitable."""
+        entry, fresh = self._lookup(url, parse)
+        if fresh:
+            return entry
+
+        key = (url, entry is not None and not entry.can_serve(parse))
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is not None:
+            self._count(url, 'coalesced')
+        else:
+            task = calls[key] = loop.create_task(self._arefresh(url, ttl_seconds, fetch, parse))
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        # Shield the shared refresh so one cancelled viewer doesn't cancel it for everyone.
+        return await asyncio.shield(task)
+
+    def get(self, url, ttl_seconds, fetch):
+        """Return the cached feed data for ``url``, or None if it could not be fetched."""
+        entry = self.get_entry(url, ttl_seconds, fetch)
+        return entry.data if entry is not None else None
+
+    async def aget(self, url, ttl_seconds, fetch):
+        entry = await self.aget_entry(url, ttl_seconds, fetch)
+        return entry.data if entry is not None else None
+
+    def get_model(self, url, ttl_seconds, fetch, parse, from_bytes=False):
+        """Return ``parse(data)`` for the feed, only re-parsing when the feed content changed.
+
+        With ``from_bytes`` the parser gets the undecoded body instead, e.g.
+        a pydantic ``model_validate_json`` that never builds the full dict.
+        """
+        return self._model(url, self.get_entry(url, ttl_seconds, fetch, parse), parse, from_bytes)
+
+    async def aget_model(self, url, ttl_seconds, fetch, parse, from_bytes=False):
+        return self._model(url, await self.aget_entry(url, ttl_seconds, fetch, parse), parse, from_bytes)
+
+    def _model(self, url, entry, parse, from_bytes=False):
+        if entry is None:
+            return None
+        model = entry.models.get(parse)
+        if model is not None:
+            self._count(url, 'parses_saved')
+            return model
+        if not entry.has_payload():
+            return None
+        model = parse(entry.raw() if from_bytes else entry.data)
+        self._count(url, 'parses')
+        entry.models[parse] = model
+        entry.release()
+        return model
+
+    def _validators(self, entry, parse):
+        return entry.validators() if entry is not None and entry.can_serve(parse) else {}
+
+    def _refresh(self, url, ttl_seconds, fetch, parse=None):
+        # Another caller may have refreshed the entry between our check and
+        # becoming the leader.
+        entry = self._entry(url)
+        if entry is not None and entry.expires_at > self._clock() and entry.can_serve(parse):
+            return entry
+
+        self._count(url, 'fetches')
+        try:
+            response = fetch(self._validators(entry, parse))
+        except Exception:
+            return self._fetch_failed(url, entry)
+        return self._store(url, entry, response, ttl_seconds)
+
+    async def _arefresh(self, url, ttl_seconds, fetch, parse=None):
+        entry = self._entry(url)
+        if entry is not None and entry.expires_at > self._clock() and entry.can_serve(parse):
+            return entry
+
+        self._count(url, 'fetches')
+        try:
+            response = await fetch(self._validators(entry, parse))
+        except Exception:
+            return self._fetch_failed(url, entry)
+        return self._store(url, entry, response, ttl_seconds)
+
+    def _fetch_failed(self, url, entry):
+        """Serve the expired entry if there is one, otherwise re-raise."""
+        self._count(url, 'errors')
+        if entry is not None:
+            self._count(url, 'stale_served')
+            return entry
+        raise
+
+    def _store(self, url, entry, response, ttl_seconds):
+        if response is None:
+            # Failed responses are never cached so the next call retries.
+            self._count(url, 'errors')
+            if entry is not None:
+                self._count(url, 'stale_served')
+            return entry
+
+        if not isinstance(response, FeedResponse):
+            response = FeedResponse(data=response)
+
+        if response.not_modified:
+            if entry is None:
+                self._count(url, 'errors')
+                return None
+            # Keep the same entry, and with it the parsed models, for another TTL.
+            self._count(url, 'not_modified')
+            self._count(url, 'bytes_saved', entry.size)
+            entry.expires_at = self._clock() + ttl_seconds
+            return entry
+
+        self._count(url, 'bytes_downloaded', response.size)
+        unchanged = entry is not None and response.etag and response.etag == entry.etag
+        stored = self.set(url, response._data, ttl_seconds, etag=response.etag,
+                          last_modified=response.last_modified, size=response.size,
+                          version=entry.version if unchanged else entry.version + 1 if entry is not None else 1,
+                          body=response.body)
+        if unchanged:
+            # Downloaded again only for a payload that had been released.
+            stored.models.update(entry.models)
+        return stored
+
+    def set(self, url, data, ttl_seconds, etag=None, last_modified=None, size=0, version=1, body=None):
+        now = self._clock()
+        entry = FeedEntry(data, now, now + ttl_seconds, etag, last_modified, size or len(body or b''), version, body)
+        with self._lock:
+            previous = self._entries.pop(url, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[url] = entry
+            self._bytes += entry.size
+            while len(self._entries) > 1 and (len(self._entries) > self.maxsize or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+        return entry
+
+    def version(self, url):
+        """Content version of the cached feed, bumped whenever a refresh returns new data."""
+        with self._lock:
+            entry = self._entries.get(url)
+        return entry.version if entry is not None else 0
+
+    def invalidate(self, url=None):
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                entry = self._entries.pop(url, None)
+                if entry is not None:
+                    self._bytes -= entry.size
+
+    def stats(self, match=None):
+        """Counters per feed URL and in total, optionally only for URLs containing ``match``."""
+        with self._lock:
+            feeds = {url: {name: counts[name] for name in self.COUNTERS}
+                     for url, counts in self._stats.items() if match is None or match in url}
+            size, size_bytes = len(self._entries), self._bytes
+        totals = {name: sum(feed[name] for feed in feeds.values()) for name in self.COUNTERS}
+        return {'size': size, 'bytes': size_bytes, 'totals': totals, 'feeds': feeds}
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that reports entries dropped for space or age."""
+
+    def __init__(self, maxsize, ttl, timer, on_evict, on_expire):
+        super().__init__(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._on_evict = on_evict
+        self._on_expire = on_expire
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_evict()
+        return item
+
+    def expire(self, time=None):
+        # TTLCache.__len__ expires first, so count with the plain Cache size.
+        before = Cache.__len__(self)
+        super().expire(time)
+        expired = before - Cache.__len__(self)
+        if expired:
+            self._on_expire(expired)
+
+
+class CacheNamespace:
+    """One named, bounded TTL cache with a lock, single-flight loads and counters.
+
+    Reads and writes are dict-like (``get``, ``set``, ``pop``, ``in``);
+    ``load``/``aload`` compute a missing value once however many threads or
+    tasks ask for it at the same time.
+    """
+
+    COUNTERS = ('hits', 'misses', 'coalesced', 'loads', 'evictions', 'expirations', 'invalidations')
+
+    def __init__(self, name, maxsize=128, ttl=60, clock=time.monotonic):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._counts = Counter()
+        self._data = _CountingTTLCache(maxsize, ttl, clock, self._evicted, self._expired)
+        self._flight = SingleFlight()
+        self._async_calls = WeakKeyDictionary()
+
+    def _evicted(self):
+        self._counts['evictions'] += 1
+
+    def _expired(self, count):
+        self._counts['expirations'] += count
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._counts['misses'] += 1
+                return default
+            self._counts['hits'] += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def invalidate(self, key=None):
+        """Drop ``key`` (or everything) and return the dropped value, if any."""
+        with self._lock:
+            self._counts['invalidations'] += 1
+            if key is None:
+                self._data.clear()
+                return None
+            return self._data.pop(key, None)
+
+    def load(self, key, compute):
+        """Return the cached value for ``key``, calling ``compute()`` once on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value
+        value, shared = self._flight.do(key, lambda: self._load(key, compute))
+        if shared:
+            with self._lock:
+                self._counts['coalesced'] += 1
+        return value
+
+    def _load(self, key, compute):
+        with self._lock:
+            self._counts['loads'] += 1
+        return self.set(key, compute())
+
+    async def aload(self, key, compute):
+        """Async :meth:`load`, ``compute()`` returns an awaitable."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is not None:
+            with self._lock:
+                self._counts['coalesced'] += 1
+        else:
+            task = calls[key] = loop.create_task(self._aload(key, compute))
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _aload(self, key, compute):
+        with self._lock:
+            self._counts['loads'] += 1
+        return self.set(key, await compute())
+
+    def stats(self):
+        with self._lock:
+            self._data.expire()
+            stats = {name: self._counts[name] for name in self.COUNTERS}
+            stats['size'] = len(self._data)
+        stats.update(maxsize=self.maxsize, ttl=self.ttl)
+        return stats
+
+
+class CacheRegistry:
+    """Named cache namespaces and the invalidation hooks that keep them honest.
+
+    Writers call :meth:`invalidate` with an event name (``'player'``,
+    ``'picks'``) instead of knowing every cache that depends on the data;
+    each cache registers for the events it cares about with :meth:`on`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces = {}
+        self._hooks = {}
+
+    def namespace(self, name, maxsize=128, ttl=60):
+        with self._lock:
+            namespace = self._namespaces.get(name)
+            if namespace is None:
+                namespace = self._namespaces[name] = CacheNamespace(name, maxsize, ttl)
+            return namespace
+
+    def on(self, event, hook):
+        with self._lock:
+            self._hooks.setdefault(event, []).append(hook)
+        return hook
+
+    def invalidate(self, event, *args):
+        with self._lock:
+            hooks = list(self._hooks.get(event, ()))
+        for hook in hooks:
+            hook(*args)
+
+    def stats(self):
+        with self._lock:
+            namespaces = dict(self._namespaces)
+        return {name: namespace.stats() for name, namespace in namespaces.items()}
+
+
+caches = CacheRegistry()
+
+
+def cached(name, ttl=60, maxsize=128, registry=caches):
+    """Cache a function's results in the ``name`` namespace, keyed by its arguments.
+
+    Works on plain and ``async`` functions; the namespace is available as
+    ``func.cache`` for invalidation.
+    """
+    def decorator(func):
+        namespace = registry.namespace(name, maxsize, ttl)
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = (args, frozenset(kwargs.items()))
+                return await namespace.aload(key, lambda: func(*args, **kwargs))
+            async_wrapper.cache = namespace
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, frozenset(kwargs.items()))
+            return namespace.load(key, lambda: func(*args, **kwargs))
+        wrapper.cache = namespace
+        return wrapper
+    return decorator
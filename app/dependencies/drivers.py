@@ -0,0 +1,120 @@
+import threading
+
+from cachetools import LRUCache
+from fastui.forms import SelectSearchResponse
+
+from app.dependencies.picks import DriverPick
+from app.models.nascar import Driver
+
+NGRAM_SIZE = 3
+
+
+def ngrams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class DriverRegistry:
+    """Pickable drivers from drivers.json, indexed once per feed refresh.
+
+    Only drivers with a crew chief are kept, as the drivers list always did.
+    Lookups and searches work on the raw feed dicts. A ``Driver`` model is
+    only built the first time a driver is actually needed, and then reused.
+    """
+
+    def __init__(self, drivers_feed):
+        entries = [item for item in drivers_feed['response'] if item['Crew_Chief']]
+        entries.sort(key=lambda item: item['Full_Name'])
+        self.entries = entries
+        self.by_id = {item['Nascar_Driver_ID']: item for item in entries}
+        # Lowercased names in the same order as ``entries`` for substring search.
+        self.names_lower = [item['Full_Name'].lower() for item in entries]
+        # 1- to 3-gram postings so a search only verifies names that can match.
+        self._grams = {}
+        for index, name in enumerate(self.names_lower):
+            for size in range(1, NGRAM_SIZE + 1):
+                for gram in ngrams(name, size):
+                    self._grams.setdefault(gram, set()).add(index)
+        self._models = {}
+        self._picks = {}
+        self._lock = threading.Lock()
+        self._options = LRUCache(maxsize=1024)
+
+    def get(self, driver_id):
+        """Raw feed entry for a Nascar_Driver_ID (int or str), or None."""
+        try:
+            return self.by_id.get(int(driver_id))
+        except (TypeError, ValueError):
+            return None
+
+    def driver(self, driver_id):
+        """``Driver`` model for a Nascar_Driver_ID, built on first use."""
+        item = self.get(driver_id)
+        if item is None:
+            return None
+        with self._lock:
+            model = self._models.get(item['Nascar_Driver_ID'])
+        if model is None:
+            model = Driver(**item)
+            with self._lock:
+                self._models[item['Nascar_Driver_ID']] = model
+        return model
+
+    def pick(self, driver_id):
+        """Shared ``DriverPick`` (id and name) for a stored pick id.
+
+        Ids missing from the feed keep their id with an empty name, so the
+        pick still counts.
+        """
+        item = self.get(driver_id)
+        if item is None:
+            return DriverPick(driver_id)
+        pick = self._picks.get(item['Nascar_Driver_ID'])
+        if pick is None:
+            pick = self._picks.setdefault(item['Nascar_Driver_ID'], DriverPick(item['Nascar_Driver_ID'], item['Full_Name']))
+        return pick
+
+    def _matches(self, query):
+        """Indexes of names containing ``query`` (already lowercased), in name order."""
+        if not query:
+            return range(len(self.entries))
+        postings = [self._grams.get(gram, set()) for gram in ngrams(query, min(len(query), NGRAM_SIZE))]
+        candidates = set.intersection(*sorted(postings, key=len))
+        return [index for index in sorted(candidates) if query in self.names_lower[index]]
+
+    def typeahead(self, query=None, allowed_ids=None):
+        """Entries matching ``query`` ranked for a search box.
+
+        Names starting with the query come first, then names with a later
+        word (usually the last name) starting with it, then any other
+        substring match, each group sorted by name. ``allowed_ids`` limits the
+        results, e.g. to the qualified field.
+        """
+        query = (query or '').lower()
+        ranked = []
+        for index in self._matches(query):
+            item = self.entries[index]
+            if allowed_ids is not None and item['Nascar_Driver_ID'] not in allowed_ids:
+                continue
+            name = self.names_lower[index]
+            if name.startswith(query):
+                rank = 0
+            elif ' ' + query in name:
+                rank = 1
+            else:
+                rank = 2
+            ranked.append((rank, index, item))
+        ranked.sort(key=lambda match: match[:2])
+        return [item for _, _, item in ranked]
+
+    def pick_options(self, query=None, allowed_ids=None) -> SelectSearchResponse:
+        """``SelectSearchResponse`` for the driver search box, cached per query."""
+        key = ((query or '').lower(), frozenset(allowed_ids) if allowed_ids is not None else None)
+        with self._lock:
+            response = self._options.get(key)
+        if response is None:
+            options = [{'label': item['Full_Name'], 'value': str(item['Nascar_Driver_ID'])}
+                       for item in self.typeahead(query, allowed_ids)]
+            response = SelectSearchResponse(options=[{'label': 'Drivers', 'options': options}])
+            with self._lock:
+                self._options[key] = response
+        return response
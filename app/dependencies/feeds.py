@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.dependencies.cache import FeedResponse
+
+FEED_TIMEOUT_SECONDS = float(os.getenv('FEED_TIMEOUT_SECONDS', '10'))
+FEED_MAX_CONNECTIONS = int(os.getenv('FEED_MAX_CONNECTIONS', '10'))
+
+
+class FeedClient:
+    """Pooled, keep-alive HTTP client for the cf.nascar.com feeds.
+
+    ``fetch`` is the asyncio API for the route handlers and ``fetch_sync`` is
+    the blocking facade for sync handlers and scripts like notifications.py.
+    Both share the same timeout and cap the number of requests in flight, so
+    a slow upstream can only tie up ``max_connections`` callers at a time.
+    """
+
+    def __init__(self, timeout=FEED_TIMEOUT_SECONDS, max_connections=FEED_MAX_CONNECTIONS):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session = None
+        self._session_loop = None
+        self._sync_session = None
+        self._sync_lock = threading.Lock()
+        self._sync_slots = threading.BoundedSemaphore(max_connections)
+
+    def _get_sync_session(self):
+        with self._sync_lock:
+            if self._sync_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_connections)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sync_session = session
+            return self._sync_session
+
+    def fetch_sync(self, url, validators=None):
+        """GET ``url``, sending ``validators`` as conditional request headers."""
+        if not self._sync_slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free feed connection for {url}")
+        try:
+            response = self._get_sync_session().get(url, headers=validators, timeout=self.timeout)
+        finally:
+            self._sync_slots.release()
+        if response.status_code == 304:
+            return FeedResponse(not_modified=True)
+        if response.status_code != 200:
+            return None
+        # Left undecoded: the cache hands it to the parser that needs it.
+        return FeedResponse(
+            body=response.content,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            size=len(response.content),
+        )
+
+    def _get_session(self):
+        # aiohttp sessions are bound to the loop they were created on.
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._session_loop = loop
+        return self._session
+
+    async def fetch(self, url, validators=None):
+        async with self._get_session().get(url, headers=validators) as response:
+            if response.status == 304:
+                return FeedResponse(not_modified=True)
+            if response.status != 200:
+                return None
+            body = await response.read()
+            return FeedResponse(
+                body=body,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                size=len(body),
+            )
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        with self._sync_lock:
+            if self._sync_session is not None:
+                self._sync_session.close()
+                self._sync_session = None
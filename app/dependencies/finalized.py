@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+
+from cachetools import TTLCache
+
+from app.dependencies.picks import FIRST_WRITE
+from app.dependencies.race_status import CHECKERED_FLAG
+from app.models.nascar import DriverPoints, LapTimesSummary, StagePoints
+
+# Bumped whenever the stored layout changes, older snapshots are re-scored.
+SNAPSHOT_SCHEMA = 1
+
+# How long after the checkered flag results are left to settle before freezing them.
+SETTLE_WINDOW = timedelta(hours=1)
+# Races this long past their start are settled as soon as a checkered flag is seen.
+SETTLED_AFTER_START = timedelta(hours=24)
+# How long a replica serves its copy of a finalized race before reading it
+# again, so an admin re-score made on another replica shows up.
+FINALIZED_CACHE_SECONDS = 300
+# Attempts at saving a snapshot or the revision index when another replica saved it first.
+SAVE_RETRIES = 5
+# Revision of every finalized race, so the standings can tell what they're missing with one read.
+INDEX_KEY = 'finalized-races'
+
+
+def race_finished(results):
+    return any(flag.FlagState == CHECKERED_FLAG for flag in results.flags)
+
+
+def contributions(driver_points):
+    """Each player's ``[points, playoff points, penalty]`` from a race, as folded into the standings."""
+    return {points.player: [points.total_points, points.total_playoff_points, int(points.penalty)]
+            for points in driver_points if points.player}
+
+
+class FinalizedRace:
+    """Frozen scores, running order and stage points of a finished race."""
+
+    def __init__(self, race_id, revision, finalized_at, driver_points, results, stage_points, replaced=None):
+        self.race_id = race_id
+        self.revision = revision
+        self.finalized_at = finalized_at
+        self.driver_points = driver_points
+        self.results = results
+        self.stage_points = stage_points
+        # Contributions of the revision this one replaced, for the standings to take back out.
+        self.replaced = replaced
+
+    def to_json(self):
+        return {
+            'type': 'finalized-race',
+            'schema': SNAPSHOT_SCHEMA,
+            'race_id': self.race_id,
+            'revision': self.revision,
+            'finalized_at': self.finalized_at.isoformat(),
+            'driver_points': [points.model_dump(mode='json', exclude_defaults=True, warnings=False) for points in self.driver_points],
+            'results': self.results.model_dump(mode='json'),
+            'stage_points': self.stage_points.model_dump(mode='json'),
+            'replaced': self.replaced,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            race_id=data['race_id'],
+            revision=data['revision'],
+            finalized_at=datetime.fromisoformat(data['finalized_at']),
+            driver_points=[DriverPoints(**points) for points in data['driver_points']],
+            results=LapTimesSummary.model_validate(data['results']),
+            stage_points=StagePoints.model_validate(data['stage_points']),
+            replaced=data.get('replaced'),
+        )
+
+
+class FinalizedRaceStore:
+    """Finished races frozen in the state store under ``final-{race_id}``.
+
+    Once a race has shown the checkered flag and the settle window has
+    passed, its computed points are saved here and every later view is
+    served from it without touching the feeds or the picks. Saving again
+    (an admin re-score after a penalty) bumps the revision; replicas pick
+    the new revision up within ``FINALIZED_CACHE_SECONDS``.
+    """
+
+    def __init__(self, client, store_name, clock=lambda: datetime.now(UTC), timer=time.monotonic):
+        self._client = client
+        self._store_name = store_name
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._races = TTLCache(maxsize=256, ttl=FINALIZED_CACHE_SECONDS, timer=timer)
+        # Races known not to be finalized yet, so live race pages don't pay a
+        # state-store read on every view.
+        self._missing = TTLCache(maxsize=256, ttl=60, timer=timer)
+        self._checkered_seen = {}
+
+    @staticmethod
+    def key(race_id):
+        return f'final-{int(race_id)}'
+
+    def _cached(self, race_id):
+        with self._lock:
+            return race_id in self._races or race_id in self._missing, self._races.get(race_id)
+
+    def get(self, race_id):
+        race_id = int(race_id)
+        known, finalized = self._cached(race_id)
+        if known:
+            return finalized
+        return self._remember(race_id, self._client.get_state(store_name=self._store_name, key=self.key(race_id)))
+
+    async def aget(self, race_id, client):
+        """``get`` for the async handlers, reading through ``client`` (a dapr.aio client)."""
+        race_id = int(race_id)
+        known, finalized = self._cached(race_id)
+        if known:
+            return finalized
+        return self._remember(race_id, await client.get_state(store_name=self._store_name, key=self.key(race_id)))
+
+    def get_many(self, race_ids, cached=True):
+        """The races' finalized snapshots, reading the ones not cached (or all of them) in one bulk read."""
+        finalized_races, unknown = [], []
+        for race_id in map(int, race_ids):
+            known, finalized = self._cached(race_id)
+            if not known or not cached:
+                unknown.append(race_id)
+            elif finalized is not None:
+                finalized_races.append(finalized)
+        if unknown:
+            items = self._client.get_bulk_state(store_name=self._store_name, keys=[self.key(race_id) for race_id in unknown]).items
+            states = {item.key: item for item in items}
+            for race_id in unknown:
+                state = states.get(self.key(race_id))
+                finalized = self._remember(race_id, state) if state is not None else None
+                if finalized is not None:
+                    finalized_races.append(finalized)
+        return finalized_races
+
+    def revisions(self):
+        """``{race_id: revision}`` of every finalized race, from the index."""
+        state = self._client.get_state(store_name=self._store_name, key=INDEX_KEY)
+        return {int(race_id): revision for race_id, revision in (state.json()['races'] if state.data else {}).items()}
+
+    @staticmethod
+    def _parse(state):
+        if state.data:
+            data = state.json()
+            if data.get('schema') == SNAPSHOT_SCHEMA:
+                return FinalizedRace.from_json(data)
+        return None
+
+    def _remember(self, race_id, state):
+        finalized = self._parse(state)
+        with self._lock:
+            if finalized is not None:
+                self._races[race_id] = finalized
+            else:
+                self._missing[race_id] = True
+        return finalized
+
+    def is_settled(self, race_id, results, start_time_utc=None):
+        """True once the checkered flag has been out for the settle window."""
+        if not race_finished(results):
+            return False
+        now = self._clock()
+        if start_time_utc is not None and now >= start_time_utc + SETTLED_AFTER_START:
+            return True
+        with self._lock:
+            seen = self._checkered_seen.setdefault(int(race_id), now)
+        return now >= seen + SETTLE_WINDOW
+
+    def save(self, race_id, driver_points, results, stage_points):
+        """Save a new revision over whatever is stored, never over a revision this replica hasn't seen."""
+        race_id = int(race_id)
+        for attempt in range(SAVE_RETRIES):
+            state = self._client.get_state(store_name=self._store_name, key=self.key(race_id))
+            previous = self._parse(state)
+            finalized = FinalizedRace(
+                race_id, previous.revision + 1 if previous else 1, self._clock(),
+                driver_points, results, stage_points,
+                replaced=contributions(previous.driver_points) if previous else None)
+            # Index first: an index ahead of its snapshot only costs the
+            # standings a wasted check, a snapshot missing from it is never folded.
+            self._index(race_id, finalized.revision)
+            try:
+                self._client.save_state(self._store_name, self.key(race_id), value=json.dumps(finalized.to_json()),
+                                        etag=state.etag or None, options=FIRST_WRITE,
+                                        state_metadata={'contentType': 'application/json'})
+                break
+            except Exception as e:
+                if attempt == SAVE_RETRIES - 1:
+                    raise
+                print(f"Finalized race {race_id} changed while saving, retrying: {e}")
+        with self._lock:
+            self._races[race_id] = finalized
+            self._missing.pop(race_id, None)
+        return finalized
+
+    def _index(self, race_id, revision):
+        for attempt in range(SAVE_RETRIES):
+            state = self._client.get_state(store_name=self._store_name, key=INDEX_KEY)
+            index = state.json() if state.data else {'type': 'finalized-races', 'races': {}}
+            if index['races'].get(str(race_id), 0) >= revision:
+                return
+            index['races'][str(race_id)] = revision
+            try:
+                self._client.save_state(self._store_name, INDEX_KEY, value=json.dumps(index),
+                                        etag=state.etag or None, options=FIRST_WRITE,
+                                        state_metadata={'contentType': 'application/json'})
+                return
+            except Exception as e:
+                if attempt == SAVE_RETRIES - 1:
+                    raise
+                print(f"Finalized race index changed while saving, retrying: {e}")
@@ -0,0 +1,260 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, UTC
+
+from app.dependencies.cache import caches
+from app.dependencies.nascar import (
+    feed_cache,
+    get_driver_points,
+    get_driver_position,
+    get_driver_stage_points,
+    get_full_race_schedule_model,
+    has_race_started,
+    lap_times_url,
+    live_stage_points_url,
+)
+
+LIVE_POLLER_ENABLED = os.getenv('LIVE_POLLER_ENABLED', 'false').lower() == 'true'
+LIVE_POLL_INTERVAL_SECONDS = float(os.getenv('LIVE_POLL_INTERVAL_SECONDS', '10'))
+# Snapshots nobody has re-checked for this long are no longer served to pages.
+LIVE_SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv('LIVE_SNAPSHOT_MAX_AGE_SECONDS', str(3 * LIVE_POLL_INTERVAL_SECONDS)))
+
+# Races are polled from shortly before their scheduled start until this long after it.
+LIVE_WINDOW_BEFORE = timedelta(minutes=15)
+LIVE_WINDOW_AFTER = timedelta(hours=12)
+
+
+class RaceSnapshot:
+    __slots__ = ('race_id', 'results', 'driver_points', 'feed_versions', 'version', 'updated_at', 'checked_at',
+                 'leaderboard', 'running_order', 'base_version', 'delta', 'running_order_changed')
+
+    def __init__(self, race_id, results, driver_points, feed_versions, version, updated_at, previous=None):
+        self.race_id = race_id
+        self.results = results
+        self.driver_points = driver_points
+        self.feed_versions = feed_versions
+        self.version = version
+        self.updated_at = updated_at
+        # Last time a refresh found the feeds unchanged since this snapshot.
+        self.checked_at = updated_at
+        # JSON-ready views for the event stream, built once per snapshot and
+        # shared by every viewer.
+        self.leaderboard = [row.model_dump(mode='json', exclude={'picks'}) for row in driver_points]
+        self.running_order = [
+            {'RunningPos': position.RunningPos, 'FullName': position.FullName,
+             'NASCARDriverID': position.NASCARDriverID, 'Number': position.Number}
+            for position in results.laps
+        ]
+        # Changes relative to the previous snapshot, for viewers that saw it.
+        self.base_version = previous.version if previous else None
+        self.delta = leaderboard_delta(previous.leaderboard, self.leaderboard) if previous else None
+        self.running_order_changed = previous is None or self.running_order != previous.running_order
+
+
+def leaderboard_delta(previous_rows, rows):
+    """Rows that changed between two leaderboards keyed by player id, None if nothing did.
+
+    Display names aren't unique, so rows, ``removed`` and ``order`` all use
+    the ``player`` id every row carries.
+    """
+    previous_by_player = {row['player']: row for row in previous_rows}
+    order = [row['player'] for row in rows]
+    current_players = set(order)
+    updated = [row for row in rows if previous_by_player.get(row['player']) != row]
+    removed = [player for player in previous_by_player if player not in current_players]
+    if not updated and not removed and order == [row['player'] for row in previous_rows]:
+        return None
+    return {'updated': updated, 'removed': removed, 'order': order}
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class LiveBoard:
+    """Latest precomputed leaderboard for each live race.
+
+    Written by the poller once per feed change and read by the race pages,
+    so a page view during a race is a dict lookup instead of a full scoring
+    run. Event streams wait on it to be told when a new snapshot lands.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._waiters = {}
+        self._versions = itertools.count(1)
+
+    def get(self, race_id):
+        with self._lock:
+            return self._snapshots.get(int(race_id))
+
+    def fresh(self, race_id, max_age=LIVE_SNAPSHOT_MAX_AGE_SECONDS):
+        """The race's snapshot if a poller has checked it recently, else None.
+
+        Once polling stops (the last stream closed, or the race ran past the
+        live window) the snapshot would otherwise be served forever.
+        """
+        snapshot = self.get(race_id)
+        if snapshot is None or time.time() - snapshot.checked_at > max_age:
+            return None
+        return snapshot
+
+    def confirm(self, race_id):
+        """Mark the race's snapshot as still current, returning it."""
+        with self._lock:
+            snapshot = self._snapshots.get(int(race_id))
+            if snapshot is not None:
+                snapshot.checked_at = time.time()
+        return snapshot
+
+    def publish(self, race_id, results, driver_points, feed_versions):
+        race_id = int(race_id)
+        with self._lock:
+            previous = self._snapshots.get(race_id)
+            snapshot = RaceSnapshot(
+                race_id, results, driver_points, feed_versions,
+                version=next(self._versions), updated_at=time.time(), previous=previous)
+            self._snapshots[race_id] = snapshot
+            waiters = self._waiters.pop(race_id, set())
+        # Publishing happens on worker threads, the waiters live on the event loop.
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return snapshot
+
+    def invalidate(self, race_id):
+        """Drop a race's snapshot, e.g. after its picks changed, so it is recomputed."""
+        with self._lock:
+            self._snapshots.pop(int(race_id), None)
+
+    async def wait_for_update(self, race_id, version, timeout):
+        """Wait until the race has a snapshot other than ``version``, False on timeout."""
+        race_id = int(race_id)
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._lock:
+            current = self._snapshots.get(race_id)
+            if current is not None and current.version != version:
+                return True
+            self._waiters.setdefault(race_id, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.get(race_id, set()).discard(waiter)
+
+
+live_board = LiveBoard()
+# New picks change the race's scores.
+caches.on('picks', live_board.invalidate)
+
+
+def live_race_ids(now=None):
+    """Races whose start time is close enough to now that they may be running."""
+    now = now or datetime.now(UTC)
+    return [
+        race.race_id
+        for race in get_full_race_schedule_model(one_week_in_future_only=True)
+        if race.start_time_utc - LIVE_WINDOW_BEFORE <= now <= race.start_time_utc + LIVE_WINDOW_AFTER
+    ]
+
+
+def refresh_race(race_id):
+    """Recompute and publish a race's leaderboard if the live feeds changed since the last snapshot."""
+    results = get_driver_position(race_id)
+    if not has_race_started(results):
+        return live_board.get(race_id)
+    get_driver_stage_points(race_id)
+
+    feed_versions = (feed_cache.version(lap_times_url(race_id)), feed_cache.version(live_stage_points_url(race_id)))
+    current = live_board.get(race_id)
+    if current is not None and current.feed_versions == feed_versions:
+        return live_board.confirm(race_id)
+    return live_board.publish(race_id, results, get_driver_points(race_id), feed_versions)
+
+
+# Races with open event streams, and the watcher tasks polling them when the
+# background poller is disabled. Only touched from the event loop.
+watched_races = {}
+watch_tasks = {}
+
+
+async def run_live_poller(interval=LIVE_POLL_INTERVAL_SECONDS):
+    while True:
+        try:
+            race_ids = set(await asyncio.to_thread(live_race_ids)) | set(watched_races)
+            for race_id in race_ids:
+                await asyncio.to_thread(refresh_race, race_id)
+        except Exception as e:
+            print(f"Live poller error: {e}")
+        await asyncio.sleep(interval)
+
+
+async def poll_watched_race(race_id, interval=LIVE_POLL_INTERVAL_SECONDS):
+    while True:
+        try:
+            await asyncio.to_thread(refresh_race, race_id)
+        except Exception as e:
+            print(f"Live watcher error for race {race_id}: {e}")
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def watch_race(race_id):
+    """Keep a race's snapshot refreshed while at least one stream is open for it."""
+    race_id = int(race_id)
+    watched_races[race_id] = watched_races.get(race_id, 0) + 1
+    if not LIVE_POLLER_ENABLED and race_id not in watch_tasks:
+        watch_tasks[race_id] = asyncio.create_task(poll_watched_race(race_id))
+    try:
+        yield
+    finally:
+        watched_races[race_id] -= 1
+        if not watched_races[race_id]:
+            del watched_races[race_id]
+            task = watch_tasks.pop(race_id, None)
+            if task:
+                task.cancel()
+            if not LIVE_POLLER_ENABLED:
+                # Nothing refreshes the snapshot any more; pages score the race themselves.
+                live_board.invalidate(race_id)
+
+
+def server_sent_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def snapshot_events(sent, snapshot):
+    """Events that bring a viewer from snapshot ``sent`` (None for a new viewer) to ``snapshot``."""
+    events = []
+    follows_sent = sent is not None and snapshot.base_version == sent.version
+    if not follows_sent:
+        events.append(server_sent_event('leaderboard', {'version': snapshot.version, 'rows': snapshot.leaderboard}))
+    elif snapshot.delta is not None:
+        events.append(server_sent_event('leaderboard-delta', {'version': snapshot.version, **snapshot.delta}))
+    if snapshot.running_order_changed if follows_sent else (sent is None or snapshot.running_order != sent.running_order):
+        events.append(server_sent_event('running-order', {'version': snapshot.version, 'laps': snapshot.running_order}))
+    return events
+
+
+async def race_event_stream(race_id, keepalive_seconds=15):
+    """Server-sent events for a race's leaderboard and running order, sent only when they change."""
+    async with watch_race(race_id):
+        sent = None
+        while True:
+            snapshot = live_board.get(race_id)
+            if snapshot is not None and (sent is None or snapshot.version != sent.version):
+                for event in snapshot_events(sent, snapshot):
+                    yield event
+                sent = snapshot
+            if not await live_board.wait_for_update(race_id, sent.version if sent else None, keepalive_seconds):
+                yield ": keepalive\n\n"
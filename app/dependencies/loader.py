@@ -0,0 +1,86 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from cachetools import LRUCache
+
+LOADER_MAX_WORKERS = int(os.getenv('LOADER_MAX_WORKERS', '8'))
+# How long one slow source may hold up a page before its last good value is used.
+SOURCE_TIMEOUT_SECONDS = float(os.getenv('SOURCE_TIMEOUT_SECONDS', '2'))
+
+# Shared by every request; prefetches are short feed and state-store reads.
+executor = ThreadPoolExecutor(max_workers=LOADER_MAX_WORKERS, thread_name_prefix='loader')
+
+
+class DataLoader:
+    """Memoizes feed and state-store reads for one ``get_driver_points`` call.
+
+    ``get(func, *args)`` runs each distinct call once, however many helpers
+    ask for it. ``prefetch`` starts independent calls on the thread pool so
+    they run concurrently, and a later ``get`` just waits for the result. A
+    prefetch that hasn't been picked up by a worker yet runs inline instead,
+    so a busy pool never makes a request slower than fetching serially.
+    """
+
+    def __init__(self, executor=executor):
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def prefetch(self, *calls):
+        """Start ``(func, *args)`` calls in the background."""
+        with self._lock:
+            for func, *args in calls:
+                key = (func, tuple(args))
+                if key not in self._futures:
+                    self._futures[key] = self._executor.submit(func, *args)
+
+    def get(self, func, *args):
+        key = (func, args)
+        with self._lock:
+            future = self._futures.get(key)
+            run = future is None or future.cancel()
+            if run:
+                future = Future()
+                self._futures[key] = future
+        if run:
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+
+class LastGood:
+    """Remembers the last value each source returned, for when it is slow or failing.
+
+    ``fetch`` returns ``(value, fresh)``. If the source takes longer than the
+    timeout or raises, the previous value for the key comes back with
+    ``fresh`` False; with nothing to fall back on it keeps waiting (or
+    re-raises). A timed-out fetch keeps running and refreshes the value for
+    the next caller.
+    """
+
+    def __init__(self, maxsize=256):
+        self._values = LRUCache(maxsize=maxsize)
+
+    async def fetch(self, key, awaitable, timeout=SOURCE_TIMEOUT_SECONDS):
+        task = asyncio.ensure_future(awaitable)
+        task.add_done_callback(lambda done: self._remember(key, done))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout), True
+        except asyncio.TimeoutError:
+            if key in self._values:
+                print(f"{key} took longer than {timeout}s, using its last good value")
+                return self._values[key], False
+            return await task, True
+        except Exception as e:
+            if key in self._values:
+                print(f"{key} failed ({e}), using its last good value")
+                return self._values[key], False
+            raise
+
+    def _remember(self, key, task):
+        if not task.cancelled() and task.exception() is None:
+            self._values[key] = task.result()
@@ -1,44 +1,70 @@
+import asyncio
+import os
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, UTC
 from typing import Generator, ClassVar, Type
 import json
-from functools import wraps
 import hashlib
 import base64
+import weakref
 
 from pydantic import BaseModel, Field
 from fastapi import Cookie, Response, HTTPException, Depends
 from dapr.clients import DaprClient
+from dapr.aio.clients import DaprClient as AsyncDaprClient
 from fastui.forms import SelectSearchResponse
-from cachetools import TTLCache
 
-from app.models.nascar import ScheduleItem, Driver, DriverPoints, WeekendFeed, Player, LapTimes, StagePoints, PlayerPicks, PicksItem, PickPoints
+from app.dependencies.cache import FeedCache, caches, cached
+from app.dependencies.drivers import DriverRegistry
+from app.dependencies.feeds import FeedClient
+from app.dependencies.finalized import FinalizedRaceStore, race_finished
+from app.dependencies.loader import DataLoader, LastGood
+from app.dependencies.picks import PicksRecord, PicksStore, RacePicks
+from app.dependencies.picks_queue import PickReceipt, PicksWriteQueue
+from app.dependencies.race_status import RaceStatus
+from app.dependencies.recipients import NotificationRecipients
+from app.dependencies.schedule import ScheduleIndex
+from app.dependencies.standings import SeasonStandings
+from app.dependencies.scoring import ScoringTable, previous_picks_index, score_players
+from app.models.nascar import Driver, DriverPoints, WeekendFeed, Player, LapTimes, LapTimesSummary, StagePoints, PlayerPicks, PicksItem, PickPoints
 
 dapr_client = DaprClient()
 STATE_STORE = 'nascar-cockroach-statestore'
 
+# grpc.aio channels belong to the event loop that opened them, so the async
+# handlers get one client per loop.
+async_dapr_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_dapr_client() -> AsyncDaprClient:
+    loop = asyncio.get_running_loop()
+    client = async_dapr_clients.get(loop)
+    if client is None:
+        client = async_dapr_clients[loop] = AsyncDaprClient()
+    return client
+
+
+async def close_async_dapr_client():
+    client = async_dapr_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
 # Get the current year for NASCAR data
 current_year = datetime.now().year
 
-def cache_with_ttl(ttl_seconds):
-    cache = TTLCache(maxsize=100, ttl=ttl_seconds)
-
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Create a cache key using the function name and arguments
-            key = (func.__name__, args, frozenset(kwargs.items()))
-            # Check if the result is already in the cache
-            if key in cache:
-                return cache[key]
-            # If not, compute the result
-            result = func(*args, **kwargs)
-            # Cache the result with the specified expiration time
-            cache[key] = result
-            return result
-        return wrapper
-    return decorator
-
+# Shared by every request in the process so each cf.nascar.com feed is only
+# downloaded once per TTL.
+feed_cache = FeedCache()
+feed_client = FeedClient()
+finalized_races = FinalizedRaceStore(dapr_client, STATE_STORE)
+picks_store = PicksStore(dapr_client, STATE_STORE)
+picks_queue = PicksWriteQueue(picks_store)
+# Picks this replica just saved, so the picks page shows them without re-reading.
+recent_picks = caches.namespace('recent-picks', maxsize=1024, ttl=60)
+season_standings = SeasonStandings(dapr_client, STATE_STORE, current_year, finalized_races)
+notification_recipients = NotificationRecipients(STATE_STORE)
+# Last value each feed and picks query returned, for get_driver_points_async.
+last_good_sources = LastGood()
 
 def generate_pydantic_class(fields: Generator[tuple, None, None]) -> Type[BaseModel]:
     class_dict = {}
@@ -55,45 +81,59 @@ def generate_pydantic_class(fields: Generator[tuple, None, None]) -> Type[BaseMo
 
 
 def load_json_with_ttl(url, ttl_seconds):
-    @cache_with_ttl(ttl_seconds=ttl_seconds)
-    def fetch_json():
-        json_response = requests.get(url)
-        if json_response.status_code != 200:
-            return None
-        return json_response.json()
-    return fetch_json()
+    return feed_cache.get(url, ttl_seconds, lambda validators: feed_client.fetch_sync(url, validators))
+
+
+async def load_json_with_ttl_async(url, ttl_seconds):
+    return await feed_cache.aget(url, ttl_seconds, lambda validators: feed_client.fetch(url, validators))
+
+
+def load_model_with_ttl(url, ttl_seconds, parse, from_bytes=False):
+    """Like load_json_with_ttl, but reuses ``parse(json)`` until the feed content changes.
+
+    ``from_bytes`` parsers get the undecoded body, so the feed is never held as a dict.
+    """
+    return feed_cache.get_model(url, ttl_seconds, lambda validators: feed_client.fetch_sync(url, validators), parse, from_bytes)
+
+
+async def load_model_with_ttl_async(url, ttl_seconds, parse, from_bytes=False):
+    return await feed_cache.aget_model(url, ttl_seconds, lambda validators: feed_client.fetch(url, validators), parse, from_bytes)
+
+
+SCHEDULE_URL = f"https://cf.nascar.com/cacher/{current_year}/1/schedule-feed.json"
+
+
+def lap_times_url(race_id):
+    return f"https://cf.nascar.com/cacher/{current_year}/1/{race_id}/lap-times.json"
+
+
+def live_stage_points_url(race_id):
+    return f"https://cf.nascar.com/cacher/{current_year}/1/{race_id}/live-stage-points.json"
 
 
-@cache_with_ttl(ttl_seconds=86400)
 def get_full_schedule():
-    schedule_url = f"https://cf.nascar.com/cacher/{current_year}/1/schedule-feed.json"
-    return load_json_with_ttl(schedule_url, 86400)
+    return load_json_with_ttl(SCHEDULE_URL, 86400)
+
+
+async def get_full_schedule_async():
+    return await load_json_with_ttl_async(SCHEDULE_URL, 86400)
+
+
+def get_schedule_index() -> ScheduleIndex:
+    return load_model_with_ttl(SCHEDULE_URL, 86400, ScheduleIndex)
+
+
+async def get_schedule_index_async() -> ScheduleIndex:
+    return await load_model_with_ttl_async(SCHEDULE_URL, 86400, ScheduleIndex)
 
 
 def get_full_race_schedule_model(id=None, one_week_in_future_only=None, text_notifications_only=None):
-    full_schedule = get_full_schedule()
-    current_date = datetime.now()
-    full_schedule_sorted = sorted(
-        full_schedule, key=lambda x: x['start_time_utc'])
-    # Find the first race event
-    first_race = next((item for item in full_schedule_sorted if item['event_name'] == 'Race' or item['event_name'] == 'Race (ALL-STAR)' or 'Duel' in item['race_name']), None)
-    
-    filtered_schedule = {}
-    if first_race and not text_notifications_only:
-        filtered_schedule[first_race['race_id']] = ScheduleItem(**first_race)
-    
-    # Add other races within the time window
-    for item in full_schedule_sorted:
-        if item['race_id'] == id and (item['event_name'] == 'Race' or item['event_name'] == 'Race (ALL-STAR)' or 'Duel' in item['event_name']):
-            return ScheduleItem(**item)
-        if (item['race_id'] != first_race['race_id'] and  # Skip the first race since we already added it
-            (item['event_name'] == 'Race' or item['event_name'] == 'Race (ALL-STAR)' or 'Duel' in item['event_name']) and
-            (not one_week_in_future_only or 
-             (datetime.strptime(item["start_time_utc"], "%Y-%m-%dT%H:%M:%S") < current_date + timedelta(days=5) and 
-              (not text_notifications_only or datetime.strptime(item["start_time_utc"], "%Y-%m-%dT%H:%M:%S") >= current_date)))):
-            filtered_schedule[item['race_id']] = ScheduleItem(**item)
-    filtered_schedule = list(filtered_schedule.values())
-    return filtered_schedule
+    return get_schedule_index().select(id, one_week_in_future_only, text_notifications_only)
+
+
+async def get_full_race_schedule_model_async(id=None, one_week_in_future_only=None, text_notifications_only=None):
+    schedule_index = await get_schedule_index_async()
+    return schedule_index.select(id, one_week_in_future_only, text_notifications_only)
 
 
 def get_current_weekend_schedule():
@@ -116,16 +156,26 @@ def get_current_weekend_schedule():
     return current_weekend_race
 
 
+def weekend_feed_url(race_id):
+    return f"https://cf.nascar.com/cacher/{current_year}/1/{race_id}/weekend-feed.json"
+
+
 def get_weekend_feed(race_id):
     try:
-        weekend_feed_response = load_json_with_ttl(
-            f"https://cf.nascar.com/cacher/{current_year}/1/{race_id}/weekend-feed.json", 3600)
+        weekend_feed_response = load_json_with_ttl(weekend_feed_url(race_id), 3600)
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 403:
             print(f"Access denied for race ID {race_id}. The race information may not be available yet.")
             return WeekendFeed(weekend_race=[], weekend_runs=[])
         raise  # Re-raise other HTTP errors
+    return parse_weekend_feed(weekend_feed_response)
+
 
+async def get_weekend_feed_async(race_id):
+    return parse_weekend_feed(await load_json_with_ttl_async(weekend_feed_url(race_id), 3600))
+
+
+def parse_weekend_feed(weekend_feed_response):
     try:
         weekend_feed_model = WeekendFeed(**weekend_feed_response)
         
@@ -146,6 +196,13 @@ def get_qualified_drivers(race_id):
             return run.results
 
 
+async def get_qualified_drivers_async(race_id):
+    weekend_feed = await get_weekend_feed_async(race_id)
+    for run in weekend_feed.weekend_runs:
+        if run.run_type == 2:
+            return run.results
+
+
 def get_results(race_id):
     weekend_feed = get_weekend_feed(race_id)
     return weekend_feed.weekend_race[0].results
@@ -155,30 +212,65 @@ def get_results(race_id):
     return drivers_models
 
 
-def get_driver_position(race_id) -> LapTimes:
+def get_driver_position(race_id) -> LapTimesSummary:
     try:
-        positions = load_json_with_ttl(
-            f"https://cf.nascar.com/cacher/{current_year}/1/{race_id}/lap-times.json", 10)
-        positions_model = LapTimes(**positions)
+        positions_model = load_model_with_ttl(lap_times_url(race_id), 10, LapTimesSummary.model_validate_json, from_bytes=True)
+        if positions_model is None:
+            return LapTimesSummary(laps=[], flags=[])
         return positions_model
+    except:
+        return LapTimesSummary(laps=[], flags=[])
+
+
+async def get_driver_position_async(race_id) -> LapTimesSummary:
+    try:
+        positions_model = await load_model_with_ttl_async(lap_times_url(race_id), 10, LapTimesSummary.model_validate_json, from_bytes=True)
+        if positions_model is None:
+            return LapTimesSummary(laps=[], flags=[])
+        return positions_model
+    except Exception:
+        return LapTimesSummary(laps=[], flags=[])
+
+
+def get_lap_history(race_id) -> LapTimes:
+    """Full lap-by-lap history, only parsed when a view asks for it."""
+    try:
+        lap_history = load_model_with_ttl(lap_times_url(race_id), 10, LapTimes.model_validate_json, from_bytes=True)
+        if lap_history is None:
+            return LapTimes(laps=[], flags=[])
+        return lap_history
     except:
         return LapTimes(laps=[], flags=[])
 
 
+race_status = RaceStatus(
+    get_race=lambda race_id: get_full_race_schedule_model(id=race_id),
+    get_results=lambda race_id: get_driver_position(race_id=race_id),
+    aget_race=lambda race_id: get_full_race_schedule_model_async(id=race_id),
+    aget_results=lambda race_id: get_driver_position_async(race_id=race_id),
+)
+
+
 def race_started(race_id):
-    laps_and_flags = get_driver_position(race_id=race_id)
-    for flag in laps_and_flags.flags:
-        if flag.FlagState == 1:
-            return True
-    return False
+    return race_status.started(race_id)
+
+
+async def race_started_async(race_id):
+    return await race_status.astarted(race_id)
 
 
 def get_driver_stage_points(race_id) -> StagePoints:
-    stage_points = load_json_with_ttl(
-        f"https://cf.nascar.com/cacher/{current_year}/1/{race_id}/live-stage-points.json", 10)
+    stage_points = load_model_with_ttl(live_stage_points_url(race_id), 10, StagePoints.model_validate_json, from_bytes=True)
     if stage_points is None:
         return StagePoints(root=[])
-    return StagePoints(root=stage_points)
+    return stage_points
+
+
+async def get_driver_stage_points_async(race_id) -> StagePoints:
+    stage_points = await load_model_with_ttl_async(live_stage_points_url(race_id), 10, StagePoints.model_validate_json, from_bytes=True)
+    if stage_points is None:
+        return StagePoints(root=[])
+    return stage_points
 
 
 def get_race_drivers_search_model(race_id) -> SelectSearchResponse:
@@ -194,26 +286,25 @@ def get_race_drivers_search_model(race_id) -> SelectSearchResponse:
     return SelectSearchResponse(options=all_drivers_options)
 
 
-def get_drivers(series=None, id=None, query=None) -> list[Driver]:
-    drivers = load_json_with_ttl("https://cf.nascar.com/cacher/drivers.json", 3600)
-    #  or item['Driver_Series'] == series
-    drivers_models = [Driver(**item) for item in drivers['response'] if (series == None or True) and (
-        id == None or item['Nascar_Driver_ID'] == int(id)) and item['Crew_Chief'] and (not query or query.lower() in item['Full_Name'].lower())]
-    drivers_models = sorted(drivers_models, key=lambda x: x.Full_Name)
-    return drivers_models
+DRIVERS_URL = "https://cf.nascar.com/cacher/drivers.json"
 
 
-def get_all_cup_drivers_pick_options(query: str = None) -> SelectSearchResponse:
-    drivers = get_drivers(series='nascar-cup-series', query=query)
-    all_drivers = [{'label': driver.Full_Name, 'value': str(
-        driver.Nascar_Driver_ID)} for driver in drivers]
-    all_drivers_options = [
-        {
-            'label': 'Drivers',
-            'options': all_drivers
-        }
-    ]
-    return SelectSearchResponse(options=all_drivers_options)
+def get_driver_registry() -> DriverRegistry:
+    return load_model_with_ttl(DRIVERS_URL, 3600, DriverRegistry)
+
+
+async def get_driver_registry_async() -> DriverRegistry:
+    return await load_model_with_ttl_async(DRIVERS_URL, 3600, DriverRegistry)
+
+
+async def get_all_cup_drivers_pick_options_async(query: str = None, race_id=None, qualified_only=False) -> SelectSearchResponse:
+    allowed_ids = None
+    if qualified_only and race_id:
+        # Before qualifying there is no field yet, so every driver stays pickable.
+        qualified = await get_qualified_drivers_async(race_id)
+        if qualified:
+            allowed_ids = {driver.driver_id for driver in qualified}
+    return (await get_driver_registry_async()).pick_options(query, allowed_ids)
 
 
 def get_drivers_list(race_weekend_feed):
@@ -229,14 +320,9 @@ def get_drivers_list(race_weekend_feed):
     return drivers_list
 
 
-def publish_driver_picks(player_id, race_id, picks):
-
-    if picks.player_select:
-        key = f'picks-{picks.player_select}-{race_id}'
-        picking_player = picks.player_select
-    else:
-        key = f'picks-{player_id}-{race_id}'
-        picking_player = player_id
+def picks_record(player_id, race_id, picks):
+    picking_player = picks.player_select or player_id
+    key = PicksStore.key(picking_player, race_id)
 
     pick_time = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
     payload = {
@@ -246,45 +332,64 @@ def publish_driver_picks(player_id, race_id, picks):
         'type': 'picks',
         'pick_time': pick_time
     }
-    dapr_client.save_state(STATE_STORE, key, value=json.dumps(payload), state_metadata={
-        'contentType': 'application/json'
-    })
-    return
+    return key, payload
 
 
-def get_driver_picks(race_id, player_id=None) -> PlayerPicks:
+async def publish_driver_picks_async(player_id, race_id, picks) -> PickReceipt:
+    """Queue the picks for the next batched write and return its receipt once stored."""
+    key, payload = picks_record(player_id, race_id, picks)
+    receipt = await picks_queue.submit(key, payload, get_async_dapr_client())
+    recent_picks.set(key, payload)
+    caches.invalidate('picks', int(race_id))
+    return receipt
 
-    query = {
-        "filter": {
-            "AND": [
-                {
-                    "EQ": {"race": str(race_id)},
-                },
-                {
-                    "EQ": {"type": "picks"}
-                }
-            ]
-        }
-    }
+
+def get_driver_picks(race_id, player_id=None) -> RacePicks:
     if player_id:
-        query['filter']['AND'].append(
-            {
-                "EQ": {"player": f'{player_id}'}
-            }
-        )
-    race_picks = dapr_client.query_state(
-        store_name=STATE_STORE, query=json.dumps(query)
+        recent = recent_picks.get(PicksStore.key(player_id, race_id))
+        if recent is not None:
+            return RacePicks([PicksRecord.from_json(recent, get_driver_registry())])
+        return RacePicks(picks_records(picks_store.player_race(player_id, race_id)))
+    return get_races_driver_picks((race_id,))[int(race_id)]
+
+
+async def get_driver_picks_async(race_id, player_id=None) -> RacePicks:
+    if not player_id:
+        return (await get_races_driver_picks_async((race_id,)))[int(race_id)]
+    recent = recent_picks.get(PicksStore.key(player_id, race_id))
+    if recent is not None:
+        return RacePicks([PicksRecord.from_json(recent, await get_driver_registry_async())])
+    race_picks, drivers = await asyncio.gather(
+        picks_store.aplayer_race(player_id, race_id, get_async_dapr_client()),
+        get_driver_registry_async(),
     )
-    drivers_dict = {str(driver.Nascar_Driver_ID): driver for driver in get_drivers()}
-    race_picks_list = [
-        {
-            key: [drivers_dict.get(pick_id, None) for pick_id in value] if key == 'picks' else value
-            for key, value in item.json().items()
-        }
-        for item in race_picks.results
-    ]
-    race_picks_model = PlayerPicks(root=race_picks_list)
-    return race_picks_model
+    return RacePicks(picks_records(race_picks, drivers))
+
+
+def get_races_driver_picks(race_ids) -> dict[int, RacePicks]:
+    """Picks for several races from their manifests and one bulk read, by race id."""
+    return group_races_picks(picks_store.races(race_ids), race_ids)
+
+
+async def get_races_driver_picks_async(race_ids) -> dict[int, RacePicks]:
+    race_picks, drivers = await asyncio.gather(
+        picks_store.araces(race_ids, get_async_dapr_client()),
+        get_driver_registry_async(),
+    )
+    return group_races_picks(race_picks, race_ids, drivers)
+
+
+def group_races_picks(results, race_ids, drivers=None):
+    picks_by_race = {int(race_id): [] for race_id in race_ids}
+    for record in picks_records(results, drivers):
+        picks_by_race[int(record.race)].append(record)
+    return {race_id: RacePicks(records) for race_id, records in picks_by_race.items()}
+
+
+def picks_records(results, drivers=None):
+    """Compact PicksRecords for stored picks; Driver models are only built by ``hydrate``."""
+    drivers = drivers or get_driver_registry()
+    return [PicksRecord.from_json(item.json(), drivers) for item in results]
 
 
 ##
@@ -350,22 +455,21 @@ def calculate_stage_points(all_driver_stage_points, pick):
     return stage_points, stage_wins
 
 
-def calculate_points(results: LapTimes, player_name: str, player_picks: PicksItem, all_driver_stage_points: StagePoints, previous_race_picks: PlayerPicks, playoff_race: bool) -> DriverPoints:
-    repeated_picks = [
-        previous
+def calculate_points(results: LapTimesSummary, player_name: str, player_picks: PicksItem, all_driver_stage_points: StagePoints, previous_race_picks: PlayerPicks, playoff_race: bool) -> DriverPoints:
+    previous_ids = {
+        previous.Nascar_Driver_ID
         for previous_pick in previous_race_picks
         if previous_pick.player == player_picks.player
         for previous in previous_pick.picks
-        for current in player_picks.picks
-        if previous.model_dump() == current.model_dump()
-    ]
+    }
+    repeated_ids = previous_ids & {pick.Nascar_Driver_ID for pick in player_picks.picks}
 
     points = 0
     picks_data = [PickPoints(), PickPoints(), PickPoints()]
 
     if results.laps or results.flags:
         for index, pick in enumerate(player_picks.picks):
-            if pick in repeated_picks:
+            if pick.Nascar_Driver_ID in repeated_ids:
                 picks_data[index].repeated_pick = True
             picks_data[index].name = pick.Full_Name
             picks_data[index].position_points = calculate_position_points(results, pick)
@@ -374,34 +478,132 @@ def calculate_points(results: LapTimes, player_name: str, player_picks: PicksIte
             picks_data[index].stage_points, picks_data[index].stage_wins = stage_points, stage_wins
             points += picks_data[index].stage_points
 
-    return DriverPoints(name=player_name, pick_time=player_picks.pick_time, playoff_race=playoff_race, picks=picks_data)
+    return DriverPoints(player=player_picks.player, name=player_name, pick_time=player_picks.pick_time, playoff_race=playoff_race, picks=picks_data)
+
+
+# Repeated-pick indexes of races that have started, whose picks can no longer
+# change except through an admin edit. An edit drops the entry on the replica
+# that made it; the TTL bounds how long other replicas score with the old one.
+PREVIOUS_PICKS_INDEX_TTL_SECONDS = int(os.getenv('PREVIOUS_PICKS_INDEX_TTL_SECONDS', '300'))
+previous_picks_indexes = caches.namespace('previous-picks-indexes', maxsize=64, ttl=PREVIOUS_PICKS_INDEX_TTL_SECONDS)
+caches.on('picks', previous_picks_indexes.invalidate)
+
+
+def get_previous_picks_index(race_id, race_picks=None, started=None):
+    race_id = int(race_id)
+    index = previous_picks_indexes.get(race_id)
+    if index is None:
+        index = previous_picks_index(race_picks if race_picks is not None else get_driver_picks(race_id))
+        if started if started is not None else race_started(race_id):
+            previous_picks_indexes.set(race_id, index)
+    return index
+
+
+def get_driver_points(race_id, rescore=False, loader=None):
+    race_id = int(race_id)
+    if not rescore:
+        finalized = finalized_races.get(race_id)
+        if finalized is not None:
+            return finalized.driver_points
+
+    # The feeds don't depend on each other or on the picks, so fetch them
+    # while the picks are being resolved.
+    loader = loader or DataLoader()
+    loader.prefetch(
+        (get_schedule_index,),
+        (get_driver_registry,),
+        (get_weekend_feed, race_id),
+        (get_driver_position, race_id),
+        (get_driver_stage_points, race_id),
+    )
+    schedule_index = loader.get(get_schedule_index)
+    current_race = schedule_index.get(race_id)
+    previous_race = schedule_index.previous_points_race(race_id)
+
+    # The previous race's picks come back in the same query as this race's,
+    # unless its repeated-pick index is already cached.
+    race_ids = [race_id]
+    if previous_race and previous_race.race_id not in previous_picks_indexes:
+        race_ids.append(previous_race.race_id)
+        loader.prefetch((race_started, previous_race.race_id))
+    picks_by_race = loader.get(get_races_driver_picks, tuple(race_ids))
+    race_picks = picks_by_race[race_id]
+    previous_index = {}
+    if previous_race:
+        previous_index = previous_picks_indexes.get(previous_race.race_id)
+        if previous_index is None:
+            previous_index = get_previous_picks_index(
+                previous_race.race_id, picks_by_race.get(previous_race.race_id), loader.get(race_started, previous_race.race_id))
+
+    weekend_feed = loader.get(get_weekend_feed, race_id)
+    playoff_race = is_playoff_race(weekend_feed)
 
+    results = loader.get(get_driver_position, race_id)
+    all_driver_stage_points = loader.get(get_driver_stage_points, race_id)
 
-def get_driver_points(race_id):
-    race_picks = get_driver_picks(race_id)
-    full_schedule = get_full_race_schedule_model()
-    current_race = get_full_race_schedule_model(id=race_id)
-    weekend_feed = get_weekend_feed(race_id)
+    players = get_players_by_id(player_picks.player for player_picks in race_picks)
+    players_points = score_race(race_picks, players, previous_index, playoff_race, results, all_driver_stage_points)
+
+    if rescore or finalized_races.is_settled(race_id, results, getattr(current_race, 'start_time_utc', None)):
+        finalize_race(race_id, players_points, results, all_driver_stage_points)
+    return players_points
+
+
+async def get_driver_points_async(race_id, rescore=False):
+    """get_driver_points with the picks query and the feeds fetched concurrently.
+
+    Each source gets SOURCE_TIMEOUT_SECONDS; a slow or failing one falls back
+    to its last good value, and a race scored from a fallback isn't finalized.
+    """
+    race_id = int(race_id)
+    schedule = asyncio.ensure_future(last_good_sources.fetch('schedule', get_schedule_index_async()))
+    if not rescore:
+        finalized = await finalized_races.aget(race_id, get_async_dapr_client())
+        if finalized is not None:
+            schedule.cancel()
+            return finalized.driver_points
+
+    schedule_index, schedule_fresh = await schedule
+    current_race = schedule_index.get(race_id)
+    previous_race = schedule_index.previous_points_race(race_id)
+
+    race_ids = [race_id]
+    previous_started = None
+    if previous_race and previous_race.race_id not in previous_picks_indexes:
+        race_ids.append(previous_race.race_id)
+        previous_started = race_started_async(previous_race.race_id)
+    (picks_by_race, picks_fresh), (weekend_feed, _), (results, results_fresh), (all_driver_stage_points, stage_points_fresh), previous_started = await asyncio.gather(
+        last_good_sources.fetch(('picks', race_id), get_races_driver_picks_async(tuple(race_ids))),
+        last_good_sources.fetch(('weekend-feed', race_id), get_weekend_feed_async(race_id)),
+        last_good_sources.fetch(('lap-times', race_id), get_driver_position_async(race_id)),
+        last_good_sources.fetch(('live-stage-points', race_id), get_driver_stage_points_async(race_id)),
+        previous_started or asyncio.sleep(0),
+    )
+    race_picks = picks_by_race[race_id]
+    previous_index = {}
+    if previous_race:
+        previous_index = previous_picks_indexes.get(previous_race.race_id)
+        if previous_index is None:
+            previous_race_picks = picks_by_race.get(previous_race.race_id)
+            if previous_race_picks is None:
+                previous_race_picks = await get_driver_picks_async(previous_race.race_id)
+            previous_index = get_previous_picks_index(previous_race.race_id, previous_race_picks, bool(previous_started))
     playoff_race = is_playoff_race(weekend_feed)
 
-    previous_race_picks = PlayerPicks(root=[])
-    if current_race.event_name == 'Race':
-        points_race_begin = False
-        for race_index in range(len(full_schedule)):
-            if full_schedule[race_index].race_name == "DAYTONA 500":
-                points_race_begin = True
-                continue
-            if full_schedule[race_index].race_id == race_id and race_index > 0 and points_race_begin:
-                previous_race_picks = get_driver_picks(full_schedule[race_index-1].race_id)
-
-    results = get_driver_position(race_id)
+    players = await get_players_by_id_async(player_picks.player for player_picks in race_picks)
+    players_points = score_race(race_picks, players, previous_index, playoff_race, results, all_driver_stage_points)
+
+    fresh = schedule_fresh and picks_fresh and results_fresh and stage_points_fresh
+    if fresh and (rescore or finalized_races.is_settled(race_id, results, getattr(current_race, 'start_time_utc', None))):
+        await asyncio.to_thread(finalize_race, race_id, players_points, results, all_driver_stage_points)
+    return players_points
+
+
+def score_race(race_picks, players, previous_index, playoff_race, results, all_driver_stage_points):
     race_started = has_race_started(results)
-    all_driver_stage_points = get_driver_stage_points(race_id)
 
-    players_points = [
-        calculate_points(results, get_player(player_id=player_picks.player).name, player_picks, all_driver_stage_points, previous_race_picks, playoff_race)
-        for player_picks in race_picks
-    ]
+    scoring_table = ScoringTable(results, all_driver_stage_points)
+    players_points = score_players(scoring_table, race_picks, players, previous_index, playoff_race)
 
     players_points.sort(key=lambda x: getattr(x, 'total_points'), reverse=True)
 
@@ -411,7 +613,37 @@ def get_driver_points(race_id):
     return players_points
 
 
-def publish_user(form):
+def finalize_race(race_id, players_points, results, all_driver_stage_points):
+    if race_finished(results):
+        finalized = finalized_races.save(race_id, players_points, results, all_driver_stage_points)
+        # Its pages are served from the snapshot now; don't keep its feeds for revalidation.
+        for url in (lap_times_url(race_id), live_stage_points_url(race_id), weekend_feed_url(race_id)):
+            feed_cache.invalidate(url)
+        try:
+            # Exhibitions (the Clash, the Duels, the All-Star Race) don't count.
+            if race_id in get_schedule_index().points_race_ids:
+                season_standings.fold(finalized)
+        except Exception as e:
+            # get_season_standings folds it in on the next read.
+            print(f"Error folding race {race_id} into the season standings: {e}")
+
+
+def get_season_standings():
+    """Season standings, after folding in any finalized points race they are missing."""
+    now = datetime.now(UTC)
+    started = [race.race_id for race in get_schedule_index().points_races if race.start_time_utc <= now]
+    return season_standings.standings(started)
+
+
+def rescore_race(race_id):
+    """Recompute a race from fresh feeds and picks, replacing its finalized snapshot."""
+    feed_cache.invalidate(lap_times_url(race_id))
+    feed_cache.invalidate(live_stage_points_url(race_id))
+    player_cache.invalidate()
+    return get_driver_points(race_id, rescore=True)
+
+
+def player_record(form):
     key = f'player-{form.name.replace(" ", "-").lower()}-{form.phone_number}'
 
     # Use a secure hash function like SHA-256
@@ -431,13 +663,20 @@ def publish_user(form):
         'admin': form.admin
     }
     print(payload)
-    dapr_client.save_state(STATE_STORE, key, value=json.dumps(payload), state_metadata={
+    return key, payload
+
+
+async def publish_user_async(form):
+    key, payload = player_record(form)
+    client = get_async_dapr_client()
+    await client.save_state(STATE_STORE, key, value=json.dumps(payload), state_metadata={
         'contentType': 'application/json'
     })
-    return
+    await notification_recipients.aupdate(payload, client)
+    caches.invalidate('player', key)
 
 
-def get_player_interface(response: Response, player_id: str = None, player_id_cookie=Cookie(None)):
+async def get_player_interface_async(response: Response, player_id: str = None, player_id_cookie=Cookie(None)):
     if player_id:
         response.set_cookie(key="player_id_cookie",
                             value=player_id, max_age=259200, httponly=True)
@@ -445,71 +684,146 @@ def get_player_interface(response: Response, player_id: str = None, player_id_co
         player_id = player_id_cookie
     else:
         raise HTTPException(status_code=401, detail="Cannot identify you.")
-    return get_player(player_hash=player_id)
+    return await get_player_async(player_hash=player_id)
 
 
-def check_admin_user(admin: Player = Depends(get_player_interface)):
+async def check_admin_user_async(admin: Player = Depends(get_player_interface_async)):
     if admin.admin:
         return admin
     else:
         raise HTTPException(status_code=401, detail="Only admins can do this.")
 
 
-@cache_with_ttl(ttl_seconds=60)
-def get_player(player_hash=None, player_id=None):
+class PlayerCache:
+    """Players by id and by hash, so a player loaded either way serves both lookups.
+
+    Entries expire after ``ttl_seconds`` so edits made by other replicas show
+    up, and publish_user_async/delete_player_async drop them right away in this one.
+    """
+
+    def __init__(self, ttl_seconds=60, maxsize=1024, registry=caches):
+        self._by_id = registry.namespace('players-by-id', maxsize, ttl_seconds)
+        self._by_hash = registry.namespace('players-by-hash', maxsize, ttl_seconds)
+
+    def by_id(self, player_id):
+        return self._by_id.get(player_id)
+
+    def by_hash(self, player_hash):
+        return self._by_hash.get(player_hash)
+
+    def add(self, player):
+        self._by_id.set(player.id, player)
+        self._by_hash.set(player.hash, player)
+        return player
+
+    def invalidate(self, player_id=None):
+        if player_id is None:
+            self._by_id.invalidate()
+            self._by_hash.invalidate()
+            return
+        player = self._by_id.invalidate(player_id)
+        if player is not None:
+            self._by_hash.invalidate(player.hash)
+
+
+player_cache = PlayerCache()
+caches.on('player', player_cache.invalidate)
+
+UNKNOWN_PLAYER = Player(name='Unknown', phone_number='9999999999', id="1234567890", hash="1234567890", type="player", admin=False)
+
+
+def get_players_by_id(player_ids) -> dict[str, Player]:
+    """Resolve many players with at most one state-store round trip."""
+    players = {player_id: player_cache.by_id(player_id) for player_id in set(player_ids)}
+    missing = [player_id for player_id, player in players.items() if player is None]
+    if missing:
+        response = dapr_client.get_bulk_state(store_name=STATE_STORE, keys=missing)
+        for item in response.items:
+            if item.data:
+                players[item.key] = player_cache.add(Player(**item.json()))
+    return {player_id: player or UNKNOWN_PLAYER for player_id, player in players.items()}
+
+
+async def get_players_by_id_async(player_ids) -> dict[str, Player]:
+    players = {player_id: player_cache.by_id(player_id) for player_id in set(player_ids)}
+    missing = [player_id for player_id, player in players.items() if player is None]
+    if missing:
+        response = await get_async_dapr_client().get_bulk_state(store_name=STATE_STORE, keys=missing)
+        for item in response.items:
+            if item.data:
+                players[item.key] = player_cache.add(Player(**item.json()))
+    return {player_id: player or UNKNOWN_PLAYER for player_id, player in players.items()}
+
+
+async def get_player_async(player_hash=None, player_id=None):
+    cached = player_cache.by_hash(player_hash) if player_hash else player_cache.by_id(player_id)
+    if cached is not None:
+        return cached
+    client = get_async_dapr_client()
     if player_hash:
-        player_query = {
-            "filter": {
-                "EQ": {"hash": player_hash}
-            }
-        }
-        player = dapr_client.query_state(
-            store_name=STATE_STORE, query=json.dumps(player_query))
+        # Recipient records carry the player's hash too.
+        player = await client.query_state(store_name=STATE_STORE, query=json.dumps({
+            "filter": {"AND": [{"EQ": {"hash": player_hash}}, {"EQ": {"type": "player"}}]}
+        }))
         if len(player.results) == 0:
             raise HTTPException(
                 status_code=401, detail="Your user is not found in the database.")
         player = player.results[0]
     else:
-        player = dapr_client.get_state(store_name=STATE_STORE, key=player_id)
-        # test=player.json()
+        player = await client.get_state(store_name=STATE_STORE, key=player_id)
     if hasattr(player, "json"):
-        return Player(**player.json())
+        return player_cache.add(Player(**player.json()))
     else:
-        return Player(name='Unknown', phone_number='9999999999', id="1234567890", hash="1234567890", type="player")
+        return UNKNOWN_PLAYER
 
 
-# @cache_with_ttl(ttl_seconds=60)
-def get_players(id: str = None):
+@cached('players-async', ttl=60)
+async def get_players_async(id: str = None):
+    client = get_async_dapr_client()
     if id:
-        player = dapr_client.get_state(
-            store_name=STATE_STORE, key=id
-        )
+        player = await client.get_state(store_name=STATE_STORE, key=id)
         return Player(**player.json())
-    player_query = {
-        "filter": {
-            "EQ": {"type": "player"}
-        }
-    }
-    players = dapr_client.query_state(
-        store_name=STATE_STORE, query=json.dumps(player_query)
+    players = await client.query_state(
+        store_name=STATE_STORE, query=json.dumps({"filter": {"EQ": {"type": "player"}}})
     )
     return [Player(**item.json()) for item in players.results]
 
 
-def delete_player(player_id: str):
+# The admin pages list players straight after an edit.
+caches.on('player', lambda player_id=None: get_players_async.cache.invalidate())
+
+
+async def delete_player_async(player_id: str):
     """Delete a player from the state store."""
     try:
-        # Delete the player from the state store
-        delete_response = dapr_client.delete_state(
-            store_name=STATE_STORE,
-            key=player_id
-        )
+        client = get_async_dapr_client()
+        await client.delete_state(store_name=STATE_STORE, key=player_id)
+        await notification_recipients.aremove(player_id, client)
+        caches.invalidate('player', player_id)
         return True
     except Exception as e:
         print(f"Error deleting player: {e}")
         return False
 
 
+async def backfill_picks_manifests_async():
+    """Write the picks manifests of races picked before they existed, once per state store."""
+    try:
+        if await picks_store.abackfill(get_async_dapr_client()):
+            print("Backfilled the picks manifests")
+    except Exception as e:
+        print(f"Error backfilling picks manifests: {e}")
+
+
+async def backfill_notification_recipients_async():
+    """Seed the opted-in recipients from the existing players, once per state store."""
+    try:
+        if await notification_recipients.abackfill(get_players_async, get_async_dapr_client()):
+            print("Backfilled the notification recipients")
+    except Exception as e:
+        print(f"Error backfilling notification recipients: {e}")
+
+
 if __name__ == "__main__":
 
     # Get the current weekend's race
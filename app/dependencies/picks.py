@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import random
+from datetime import datetime
+
+from dapr.clients.grpc._state import Concurrency, StateItem, StateOptions
+
+from app.models.nascar import PicksItem
+
+# Attempts at adding to a race's manifest when another writer changed it first.
+MANIFEST_RETRIES = int(os.getenv('PICKS_MANIFEST_RETRIES', '8'))
+# Base of the jittered exponential backoff between those attempts.
+MANIFEST_BACKOFF_SECONDS = float(os.getenv('PICKS_MANIFEST_BACKOFF_SECONDS', '0.05'))
+# Manifest writes only succeed against the etag they were read with.
+FIRST_WRITE = StateOptions(concurrency=Concurrency.first_write)
+# Saved once every race picked before manifests existed has one; from then
+# on a race without a manifest has no picks and isn't queried.
+READY_KEY = 'picks-manifests-ready'
+
+
+class DriverPick:
+    """The two ``Driver`` fields scoring reads, for one picked driver.
+
+    DriverRegistry.pick hands out one instance per driver, so every player
+    who picked the same driver shares it.
+    """
+    __slots__ = ('Nascar_Driver_ID', 'Full_Name')
+
+    def __init__(self, driver_id, full_name=''):
+        self.Nascar_Driver_ID = driver_id
+        self.Full_Name = full_name
+
+    def __repr__(self):
+        return f'DriverPick({self.Nascar_Driver_ID}, {self.Full_Name!r})'
+
+
+class PicksRecord:
+    """One player's picks for a race, as stored, without ``Driver`` models.
+
+    Has the ``PicksItem`` attributes scoring uses (``player``, ``race``,
+    ``pick_time`` and ``picks``). :meth:`hydrate` builds the full
+    ``PicksItem`` for views that show more than the driver's name.
+    """
+    __slots__ = ('type', 'player', 'race', 'pick_time', 'picks')
+
+    def __init__(self, player, race, picks, pick_time='', type='picks'):
+        self.type = type
+        self.player = player
+        self.race = race
+        self.pick_time = pick_time
+        self.picks = picks
+
+    @classmethod
+    def from_json(cls, data, drivers):
+        pick_time = data.get('pick_time')
+        return cls(
+            player=data['player'],
+            race=str(data['race']),
+            picks=tuple(drivers.pick(pick_id) for pick_id in data['picks']),
+            pick_time=datetime.fromisoformat(pick_time) if pick_time else '',
+            type=data.get('type', 'picks'),
+        )
+
+    def hydrate(self, drivers) -> PicksItem:
+        return PicksItem(type=self.type, player=self.player, race=self.race, pick_time=self.pick_time,
+                         picks=[drivers.driver(pick.Nascar_Driver_ID) for pick in self.picks])
+
+    def __repr__(self):
+        return f'PicksRecord({self.player!r}, {self.race!r}, {self.picks!r})'
+
+
+class RacePicks:
+    """Picks records for a race, iterable and indexable like ``PlayerPicks``."""
+    __slots__ = ('root',)
+
+    def __init__(self, root=None):
+        self.root = root if root is not None else []
+
+    def __iter__(self):
+        return iter(self.root)
+
+    def __getitem__(self, item):
+        return self.root[item]
+
+    def __len__(self):
+        return len(self.root)
+
+    def __repr__(self):
+        return f'RacePicks({self.root!r})'
+
+
+def races_query(race_ids):
+    """State query for every picks record of the races, used before a race has a manifest."""
+    return json.dumps({
+        "filter": {
+            "AND": [
+                {
+                    "IN": {"race": [str(race_id) for race_id in race_ids]},
+                },
+                {
+                    "EQ": {"type": "picks"}
+                }
+            ]
+        }
+    })
+
+
+def all_picks_query():
+    """State query for every picks record, used once to write the manifests."""
+    return json.dumps({
+        "filter": {
+            "EQ": {"type": "picks"}
+        }
+    })
+
+
+def manifest_backoff(attempt):
+    """Full-jitter delay before manifest retry ``attempt``, so writers that lost the same race spread out."""
+    return random.uniform(0, MANIFEST_BACKOFF_SECONDS * 2 ** attempt)
+
+
+class PicksStore:
+    """Picks records in the state store, indexed by race.
+
+    Each record lives under ``picks-{player}-{race}`` and ``race-picks-{race}``
+    lists the record keys of that race, so loading a race's picks is two
+    bulk key reads however many seasons are stored, instead of a query over
+    every value in the store. :meth:`abackfill` writes the manifests of
+    races picked before they existed once, then saves ``READY_KEY``; until
+    then a race without a manifest is read with the old query, after it
+    such a race simply has no picks.
+    """
+
+    def __init__(self, client, store_name):
+        self._client = client
+        self._store_name = store_name
+        # Set once READY_KEY has been seen; it is never removed.
+        self._ready = False
+
+    @staticmethod
+    def key(player_id, race_id):
+        return f'picks-{player_id}-{race_id}'
+
+    @staticmethod
+    def manifest_key(race_id):
+        return f'race-picks-{int(race_id)}'
+
+    async def asave_many(self, records, client):
+        """Save ``{key: payload}`` picks records with one bulk write, after their races' manifests."""
+        keys_by_race = {}
+        for key, payload in records.items():
+            keys_by_race.setdefault(payload['race'], []).append(key)
+        await asyncio.gather(*(self.aadd_to_manifest(race_id, keys, client) for race_id, keys in keys_by_race.items()))
+        await client.save_bulk_state(self._store_name, states=[
+            StateItem(key, json.dumps(payload), metadata={'contentType': 'application/json'})
+            for key, payload in records.items()
+        ])
+
+    async def aadd_to_manifest(self, race_id, keys, client, complete=False):
+        """Add record keys to a race's manifest, returning everything it lists.
+
+        A race with no manifest yet is queried for the records it already
+        has, unless the backfill has run or ``complete`` says ``keys`` are
+        all of them.
+        """
+        for attempt in range(MANIFEST_RETRIES):
+            state = await client.get_state(store_name=self._store_name, key=self.manifest_key(race_id))
+            if state.data:
+                listed = state.json()['keys']
+            elif self._ready or complete:
+                listed = []
+            else:
+                listed = [item.key for item in (await client.query_state(self._store_name, races_query([race_id]))).results]
+            added = [key for key in keys if key not in listed]
+            if state.data and not added:
+                return listed
+            manifest = {'type': 'race-picks', 'race': str(race_id), 'keys': listed + added}
+            try:
+                await client.save_state(self._store_name, self.manifest_key(race_id), value=json.dumps(manifest),
+                                        etag=state.etag or None, options=FIRST_WRITE,
+                                        state_metadata={'contentType': 'application/json'})
+                return manifest['keys']
+            except Exception as e:
+                if attempt == MANIFEST_RETRIES - 1:
+                    raise
+                print(f"Picks manifest for race {race_id} changed while saving, retrying: {e}")
+                await asyncio.sleep(manifest_backoff(attempt))
+
+    async def abackfill(self, client):
+        """Write the manifest of every race picked before manifests existed, once per state store."""
+        ready = await client.get_state(store_name=self._store_name, key=READY_KEY)
+        if ready.data:
+            self._ready = True
+            return False
+        keys_by_race = {}
+        for item in (await client.query_state(self._store_name, all_picks_query())).results:
+            keys_by_race.setdefault(item.json()['race'], []).append(item.key)
+        for race_id, keys in keys_by_race.items():
+            await self.aadd_to_manifest(race_id, keys, client, complete=True)
+        await client.save_state(self._store_name, READY_KEY, value=json.dumps({'type': 'picks-manifests-ready'}), state_metadata={
+            'contentType': 'application/json'
+        })
+        self._ready = True
+        return True
+
+    def player_race(self, player_id, race_id):
+        """The player's picks record for the race, as a list of zero or one state items."""
+        state = self._client.get_state(store_name=self._store_name, key=self.key(player_id, race_id))
+        return [state] if state.data else []
+
+    async def aplayer_race(self, player_id, race_id, client):
+        state = await client.get_state(store_name=self._store_name, key=self.key(player_id, race_id))
+        return [state] if state.data else []
+
+    def races(self, race_ids):
+        """Every picks record of the races, as state items with ``.json()``."""
+        manifests = self._client.get_bulk_state(store_name=self._store_name, keys=self._manifest_read(race_ids)).items
+        keys, unindexed = self._manifest_keys(race_ids, manifests)
+        items = []
+        if keys:
+            items = [item for item in self._client.get_bulk_state(store_name=self._store_name, keys=keys).items if item.data]
+        if unindexed:
+            items += self._client.query_state(self._store_name, races_query(unindexed)).results
+        return items
+
+    async def araces(self, race_ids, client):
+        manifests = (await client.get_bulk_state(store_name=self._store_name, keys=self._manifest_read(race_ids))).items
+        keys, unindexed = self._manifest_keys(race_ids, manifests)
+        items = []
+        if keys:
+            items = [item for item in (await client.get_bulk_state(store_name=self._store_name, keys=keys)).items if item.data]
+        if unindexed:
+            items += (await client.query_state(self._store_name, races_query(unindexed))).results
+        return items
+
+    def _manifest_read(self, race_ids):
+        """Keys to bulk-read for the races' manifests, plus ``READY_KEY`` until it has been seen."""
+        keys = [self.manifest_key(race_id) for race_id in race_ids]
+        return keys if self._ready else keys + [READY_KEY]
+
+    def _manifest_keys(self, race_ids, manifests):
+        """Record keys the races' manifests list, and the races that still need the query.
+
+        Before the backfill has run, races without a manifest are queried
+        instead; reads never write a manifest, so a page view for any race
+        id can't create state. After it, such races have no picks.
+        """
+        manifests = {manifest.key: manifest for manifest in manifests}
+        ready = manifests.get(READY_KEY)
+        if ready is not None and ready.data:
+            self._ready = True
+        keys, unindexed = [], []
+        for race_id in race_ids:
+            manifest = manifests.get(self.manifest_key(race_id))
+            if manifest and manifest.data:
+                keys += manifest.json()['keys']
+            elif not self._ready:
+                unindexed.append(race_id)
+        return keys, unindexed
@@ -0,0 +1,107 @@
+import asyncio
+import os
+from weakref import WeakKeyDictionary
+
+# Submissions written together in one save_bulk_state.
+PICKS_BATCH_SIZE = int(os.getenv('PICKS_BATCH_SIZE', '250'))
+# How long the first submission of a batch waits for others to join it.
+PICKS_BATCH_WINDOW_SECONDS = float(os.getenv('PICKS_BATCH_WINDOW_SECONDS', '0.02'))
+# Attempts at writing a batch before its submitters get the error.
+PICKS_WRITE_ATTEMPTS = 5
+
+
+class PickReceipt:
+    """Acknowledgement that a picks record is in the state store."""
+    __slots__ = ('key', 'player', 'race', 'pick_time', 'batch_size')
+
+    def __init__(self, key, player, race, pick_time, batch_size):
+        self.key = key
+        self.player = player
+        self.race = race
+        self.pick_time = pick_time
+        self.batch_size = batch_size
+
+    def __repr__(self):
+        return f'PickReceipt({self.key!r}, {self.pick_time!r})'
+
+
+class PicksWriteQueue:
+    """Write-behind queue that saves pick submissions in batches.
+
+    ``submit`` queues a record and waits for the batch it lands in to be
+    written with one manifest update per race and one ``save_bulk_state``,
+    so a rush of picks before the green flag costs a few bulk writes instead
+    of one write per player. The receipt only comes back once the record is
+    stored. A batch that keeps failing fails its submitters instead of
+    dropping their picks. Submissions for the same key in one batch collapse
+    to the latest. Records carry the pick time they were submitted with,
+    however long the write takes.
+    """
+
+    def __init__(self, store, batch_size=PICKS_BATCH_SIZE, window=PICKS_BATCH_WINDOW_SECONDS,
+                 attempts=PICKS_WRITE_ATTEMPTS):
+        self._store = store
+        self._batch_size = batch_size
+        self._window = window
+        self._attempts = attempts
+        # One queue and writer task per event loop.
+        self._writers = WeakKeyDictionary()
+
+    async def submit(self, key, payload, client) -> PickReceipt:
+        loop = asyncio.get_running_loop()
+        writer = self._writers.get(loop)
+        if writer is None or writer[1].done():
+            queue = asyncio.Queue()
+            writer = self._writers[loop] = (queue, loop.create_task(self._run(queue)))
+        future = loop.create_future()
+        writer[0].put_nowait((key, payload, client, future))
+        # Shielded so a client disconnecting mid-request doesn't cancel the write.
+        return await asyncio.shield(future)
+
+    async def _run(self, queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self._window
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _flush(self, batch):
+        records = {}
+        for key, payload, client, future in batch:
+            records[key] = payload
+        client = batch[-1][2]
+        for attempt in range(self._attempts):
+            try:
+                await self._store.asave_many(records, client)
+                break
+            except Exception as e:
+                if attempt == self._attempts - 1:
+                    print(f"Failed to save {len(records)} picks records: {e}")
+                    for *_, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    return
+                print(f"Saving {len(records)} picks records failed, retrying: {e}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        for key, payload, client, future in batch:
+            if not future.done():
+                future.set_result(PickReceipt(key, payload['player'], payload['race'], payload['pick_time'], len(records)))
+
+    async def close(self):
+        """Wait for this loop's queued picks to be written, then stop its writer."""
+        writer = self._writers.pop(asyncio.get_running_loop(), None)
+        if writer is None:
+            return
+        queue, task = writer
+        if not task.done():
+            await queue.join()
+        task.cancel()
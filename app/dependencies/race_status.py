@@ -0,0 +1,66 @@
+import threading
+from datetime import datetime, timedelta, UTC
+
+# How long before the scheduled start the lap-times feed is worth checking.
+RACE_START_MARGIN = timedelta(minutes=15)
+
+GREEN_FLAG = 1
+CHECKERED_FLAG = 4
+
+
+class RaceStatus:
+    """Answers "has this race started?" (and so "are picks locked?") cheaply.
+
+    Before the scheduled start minus a margin the schedule alone says no. Once
+    a green flag has been seen in the lap-times feed the answer is remembered
+    for the life of the process, so only the window around the start (or the
+    first check of a past race) costs a feed lookup.
+    """
+
+    def __init__(self, get_race, get_results, aget_race=None, aget_results=None, clock=lambda: datetime.now(UTC)):
+        self._get_race = get_race
+        self._get_results = get_results
+        self._aget_race = aget_race
+        self._aget_results = aget_results
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._started = set()
+
+    def started(self, race_id):
+        race_id = int(race_id)
+        if self._known_started(race_id):
+            return True
+        if self._before_start(self._get_race(race_id)):
+            return False
+        return self._check_flags(race_id, self._get_results(race_id))
+
+    async def astarted(self, race_id):
+        """``started`` through the async getters."""
+        race_id = int(race_id)
+        if self._known_started(race_id):
+            return True
+        if self._before_start(await self._aget_race(race_id)):
+            return False
+        return self._check_flags(race_id, await self._aget_results(race_id))
+
+    def _known_started(self, race_id):
+        with self._lock:
+            return race_id in self._started
+
+    def _before_start(self, race):
+        start_time = getattr(race, 'start_time_utc', None)
+        return start_time is not None and self._clock() < start_time - RACE_START_MARGIN
+
+    def _check_flags(self, race_id, results):
+        if any(flag.FlagState == GREEN_FLAG for flag in results.flags):
+            with self._lock:
+                self._started.add(race_id)
+            return True
+        return False
+
+    def reset(self, race_id=None):
+        with self._lock:
+            if race_id is None:
+                self._started.clear()
+            else:
+                self._started.discard(int(race_id))
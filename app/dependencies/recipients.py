@@ -0,0 +1,54 @@
+import json
+
+# Saved once every player has been copied into the set; until then the
+# notification job falls back to reading the player records.
+READY_KEY = 'recipients-ready'
+RECIPIENT_FIELDS = ('id', 'name', 'phone_number', 'hash')
+
+
+def recipient_record(payload):
+    """The fields a text needs, or None if the player hasn't opted in."""
+    if not payload.get('text_notifications'):
+        return None
+    return dict({field: payload[field] for field in RECIPIENT_FIELDS}, type='recipient')
+
+
+class NotificationRecipients:
+    """Players who opted in to texts, one ``recipient-{player_id}`` key each.
+
+    publish_user_async and delete_player_async keep it current, so the notification job
+    reads just the opted-in players, and just their name, number and hash,
+    with a primary-key range scan instead of decoding every player record.
+    """
+
+    def __init__(self, store_name):
+        self._store_name = store_name
+
+    @staticmethod
+    def key(player_id):
+        return f'recipient-{player_id}'
+
+    async def aupdate(self, payload, client):
+        """Add, refresh or drop a player after their record was saved."""
+        record = recipient_record(payload)
+        if record is None:
+            await client.delete_state(store_name=self._store_name, key=self.key(payload['id']))
+        else:
+            await client.save_state(self._store_name, self.key(payload['id']), value=json.dumps(record), state_metadata={
+                'contentType': 'application/json'
+            })
+
+    async def aremove(self, player_id, client):
+        await client.delete_state(store_name=self._store_name, key=self.key(player_id))
+
+    async def abackfill(self, list_players, client):
+        """Copy existing players into the set once; ``list_players`` is only awaited if needed."""
+        ready = await client.get_state(store_name=self._store_name, key=READY_KEY)
+        if ready.data:
+            return False
+        for player in await list_players():
+            await self.aupdate(player.model_dump(), client)
+        await client.save_state(self._store_name, READY_KEY, value=json.dumps({'type': 'recipients-ready'}), state_metadata={
+            'contentType': 'application/json'
+        })
+        return True
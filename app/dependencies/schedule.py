@@ -0,0 +1,89 @@
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from app.models.nascar import ScheduleItem
+
+# How far ahead the schedule page and text notifications look.
+UPCOMING_DAYS = 5
+
+
+def is_race_event(item):
+    return item['event_name'] == 'Race' or item['event_name'] == 'Race (ALL-STAR)' or 'Duel' in item['event_name']
+
+
+class ScheduleIndex:
+    """The season's races out of schedule-feed.json, sorted and parsed once per refresh.
+
+    Answers the lookups the pages and scoring need (a race by id, the race
+    before it in the points walk, races starting in the next few days)
+    without re-sorting the feed or rebuilding ``ScheduleItem`` models.
+    """
+
+    def __init__(self, full_schedule):
+        full_schedule_sorted = sorted(full_schedule, key=lambda x: x['start_time_utc'])
+        # Always listed first on the schedule page, even once it has been run.
+        first_race = next((item for item in full_schedule_sorted if item['event_name'] == 'Race' or item['event_name'] == 'Race (ALL-STAR)' or 'Duel' in item['race_name']), None)
+        self.first_race = ScheduleItem(**first_race) if first_race else None
+
+        self.by_id = {}
+        races = {}
+        for item in full_schedule_sorted:
+            if is_race_event(item):
+                race = ScheduleItem(**item)
+                self.by_id.setdefault(race.race_id, race)
+                races[race.race_id] = race
+        if self.first_race:
+            races.pop(self.first_race.race_id, None)
+        # Race events after the first race, in start order, with naive UTC start
+        # times alongside for bisecting.
+        self.races = list(races.values())
+        self._starts = [race.start_time_utc.replace(tzinfo=None) for race in self.races]
+
+        # The whole season the way the schedule page lists it.
+        self.schedule = ([self.first_race] if self.first_race else []) + self.races
+
+        # Repeated picks are checked against the race listed just before, from
+        # the race after the DAYTONA 500 on.
+        self.points_races = []
+        self._previous = {}
+        points_race_begin = False
+        for race_index, race in enumerate(self.schedule):
+            if race.race_name == "DAYTONA 500":
+                points_race_begin = True
+                self.points_races.append(race)
+                continue
+            if points_race_begin and race_index > 0:
+                self._previous[race.race_id] = self.schedule[race_index - 1]
+                if race.event_name == 'Race':
+                    self.points_races.append(race)
+        self.points_race_ids = {race.race_id for race in self.points_races}
+
+    def get(self, race_id):
+        return self.by_id.get(race_id)
+
+    def previous_points_race(self, race_id):
+        """The race whose picks count as repeats for ``race_id``, if it is a points race."""
+        race = self.by_id.get(race_id)
+        if race is None or race.event_name != 'Race':
+            return None
+        return self._previous.get(race_id)
+
+    def upcoming(self, now=None, days=UPCOMING_DAYS, started=True):
+        """Races starting before ``now`` plus ``days``, including ones already run if ``started``."""
+        now = now or datetime.now()
+        low = 0 if started else bisect_left(self._starts, now)
+        high = bisect_left(self._starts, now + timedelta(days=days))
+        return self.races[low:max(low, high)]
+
+    def select(self, id=None, one_week_in_future_only=None, text_notifications_only=None, now=None):
+        """Same answers as the old sort-and-filter over the raw feed."""
+        if id is not None and id in self.by_id:
+            return self.by_id[id]
+        filtered_schedule = []
+        if self.first_race and not text_notifications_only:
+            filtered_schedule.append(self.first_race)
+        if one_week_in_future_only:
+            filtered_schedule += self.upcoming(now, started=not text_notifications_only)
+        else:
+            filtered_schedule += self.races
+        return filtered_schedule
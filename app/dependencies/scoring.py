@@ -0,0 +1,84 @@
+from app.models.nascar import DriverPoints, PickPoints
+
+
+class ScoringTable:
+    """Points every driver has earned in one snapshot of the live feeds.
+
+    Built once per lap-times/stage-points snapshot, it turns scoring a pick
+    into two dict lookups instead of rescanning the running order and every
+    stage's results for each pick of each player. It gives the same numbers
+    as calculate_position_points and calculate_stage_points.
+    """
+
+    def __init__(self, results, all_driver_stage_points):
+        self.position_points = {}
+        position_points = 40
+        reduction = 5
+        for result in results.laps:
+            self.position_points.setdefault(result.NASCARDriverID, position_points)
+            position_points -= reduction
+            if position_points < 1:
+                position_points = 1
+            reduction = 1
+        # Drivers missing from the running order score one step below last place.
+        self.default_position_points = position_points
+
+        self.stage_points = {}
+        if all_driver_stage_points.root:
+            for stage in all_driver_stage_points:
+                scored = set()
+                for driver_position in stage.results:
+                    driver_id = driver_position.driver_id
+                    if driver_id in scored:
+                        continue
+                    points, wins = self.stage_points.get(driver_id, (0, 0))
+                    if driver_position.position == 1:
+                        wins += 1
+                    if driver_position.position <= 10:
+                        points += 11 - driver_position.position
+                        scored.add(driver_id)
+                    self.stage_points[driver_id] = (points, wins)
+
+        self.live = bool(results.laps or results.flags)
+
+    def position(self, driver_id):
+        return self.position_points.get(driver_id, self.default_position_points)
+
+    def stage(self, driver_id):
+        return self.stage_points.get(driver_id, (0, 0))
+
+
+def previous_picks_index(previous_race_picks):
+    """player -> frozenset of the driver ids they picked, for repeated-pick checks."""
+    index = {}
+    for previous_pick in previous_race_picks:
+        driver_ids = frozenset(pick.Nascar_Driver_ID for pick in previous_pick.picks if pick is not None)
+        index[previous_pick.player] = index.get(previous_pick.player, frozenset()) | driver_ids
+    return index
+
+
+def score_players(table, race_picks, players, previous_index, playoff_race):
+    """``DriverPoints`` for every player's picks, same as calling calculate_points per player.
+
+    ``previous_index`` is the previous race's :func:`previous_picks_index`.
+    """
+    players_points = []
+    for player_picks in race_picks:
+        picks_data = []
+        if table.live:
+            previous_ids = previous_index.get(player_picks.player, frozenset())
+            for pick in player_picks.picks:
+                stage_points, stage_wins = table.stage(pick.Nascar_Driver_ID)
+                # Every value comes from the table, so skip per-field validation.
+                picks_data.append(PickPoints.model_construct(
+                    name=pick.Full_Name,
+                    repeated_pick=pick.Nascar_Driver_ID in previous_ids,
+                    stage_wins=stage_wins,
+                    stage_points=stage_points,
+                    position_points=table.position(pick.Nascar_Driver_ID),
+                ))
+        picks_data += [PickPoints.model_construct() for _ in range(3 - len(picks_data))]
+        players_points.append(DriverPoints(
+            player=player_picks.player, name=players[player_picks.player].name, pick_time=player_picks.pick_time,
+            playoff_race=playoff_race, picks=picks_data))
+    return players_points
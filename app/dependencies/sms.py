@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+# Messages in flight at once.
+SMS_CONCURRENCY = int(os.getenv('SMS_CONCURRENCY', '8'))
+# Messages started per second, across all workers.
+SMS_RATE_PER_SECOND = float(os.getenv('SMS_RATE_PER_SECOND', '10'))
+SMS_ATTEMPTS = int(os.getenv('SMS_ATTEMPTS', '4'))
+SMS_BACKOFF_SECONDS = float(os.getenv('SMS_BACKOFF_SECONDS', '0.5'))
+
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = [0.25, 0.5, 1, 2, 5, float('inf')]
+# Rate limiting and Twilio/provider outages; anything else (a bad number) won't succeed on retry.
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_transient(error):
+    """True for errors worth retrying: throttling, 5xx responses and network failures."""
+    return getattr(error, 'status', None) in TRANSIENT_STATUSES or isinstance(error, OSError)
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart across threads."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self._interval = 1 / rate if rate > 0 else 0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next)
+            self._next = slot + self._interval
+        if slot > now:
+            self._sleep(slot - now)
+
+
+class DispatchSummary:
+    """Counts and a latency histogram for one notification run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.errors = []
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+        self.elapsed = 0.0
+
+    def record(self, to, latency, error=None, retries=0):
+        with self._lock:
+            self.retries += retries
+            if error is None:
+                self.sent += 1
+                self.histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+            else:
+                self.failed += 1
+                self.errors.append((to, error))
+
+    def __str__(self):
+        lines = [f"sent {self.sent}, failed {self.failed}, retries {self.retries} in {self.elapsed:.1f}s"]
+        lower = 0
+        for upper, count in zip(LATENCY_BUCKETS, self.histogram):
+            lines.append(f"  {lower:>5}-{upper:<5}s {count}")
+            lower = upper
+        lines += [f"  failed {to}: {error}" for to, error in self.errors]
+        return "\n".join(lines)
+
+
+class SmsDispatcher:
+    """Sends text messages from a bounded thread pool under a per-second rate limit.
+
+    ``send(to, body)`` does the actual delivery (the Twilio client in
+    notifications.py, or a stub). Transient failures are retried with
+    exponential backoff; each attempt waits for a rate-limit slot.
+    """
+
+    def __init__(self, send, concurrency=SMS_CONCURRENCY, rate_per_second=SMS_RATE_PER_SECOND,
+                 attempts=SMS_ATTEMPTS, backoff_seconds=SMS_BACKOFF_SECONDS,
+                 clock=time.monotonic, sleep=time.sleep):
+        self._send = send
+        self._concurrency = concurrency
+        self._attempts = attempts
+        self._backoff = backoff_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._limiter = RateLimiter(rate_per_second, clock, sleep)
+
+    def _deliver(self, to, body, summary):
+        start = self._clock()
+        for attempt in range(self._attempts):
+            self._limiter.wait()
+            try:
+                self._send(to, body)
+            except Exception as e:
+                if attempt == self._attempts - 1 or not is_transient(e):
+                    summary.record(to, self._clock() - start, error=e, retries=attempt)
+                    return
+                self._sleep(self._backoff * 2 ** attempt)
+            else:
+                summary.record(to, self._clock() - start, retries=attempt)
+                return
+
+    def run(self, messages) -> DispatchSummary:
+        """Send ``(to, body)`` messages and wait for all of them."""
+        summary = DispatchSummary()
+        start = self._clock()
+        with ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix='sms') as executor:
+            for to, body in messages:
+                executor.submit(self._deliver, to, body, summary)
+        summary.elapsed = self._clock() - start
+        return summary
@@ -0,0 +1,124 @@
+import json
+
+from app.dependencies.finalized import contributions
+from app.dependencies.picks import FIRST_WRITE
+from app.models.nascar import SeasonStanding
+
+# Attempts at folding races when another replica saved the standings first.
+STANDINGS_RETRIES = 5
+
+
+class SeasonStandings:
+    """Running per-player season totals, folded in one finalized race at a time.
+
+    Stored in the state store under ``standings-{season}`` as the totals plus
+    the revision folded for each race. A re-scored revision carries the
+    contributions it replaced, so folding it only touches that race's
+    players and the document doesn't grow with each race's players: the
+    standings cost the same to update and to read in week 36 as in week 1.
+    Saves go against the etag they read, so replicas folding different
+    races don't overwrite each other. ``standings`` compares the folded
+    revisions with the finalized-race index and folds anything a failed
+    save left out.
+    """
+
+    def __init__(self, client, store_name, season, finalized):
+        self._client = client
+        self._store_name = store_name
+        self._finalized = finalized
+        self.key = f'standings-{season}'
+
+    def _read(self):
+        state = self._client.get_state(store_name=self._store_name, key=self.key)
+        if not state.data:
+            return {'type': 'standings', 'races': {}, 'totals': {}}, None
+        data = state.json()
+        # Older documents kept each race's contributions next to its revision.
+        data['races'] = {race_key: race['revision'] if isinstance(race, dict) else race
+                         for race_key, race in data['races'].items()}
+        return data, state.etag or None
+
+    @staticmethod
+    def _add(totals, driver_points, sign=1):
+        names = {points.player: points.name for points in driver_points}
+        for player, (points, playoff_points, penalty) in contributions(driver_points).items():
+            total = totals.setdefault(player, SeasonStanding(player=player).model_dump())
+            total['name'] = names[player]
+            total['points'] += sign * points
+            total['playoff_points'] += sign * playoff_points
+            total['penalties'] += sign * penalty
+            total['races'] += sign
+
+    @staticmethod
+    def _take_back(totals, replaced):
+        for player, (points, playoff_points, penalty) in replaced.items():
+            total = totals[player]
+            total['points'] -= points
+            total['playoff_points'] -= playoff_points
+            total['penalties'] -= penalty
+            total['races'] -= 1
+
+    def _apply(self, state, finalized):
+        """Fold one finalized race into ``state``, False if it already has that revision."""
+        race_key = str(finalized.race_id)
+        seen = state['races'].get(race_key, 0)
+        if seen >= finalized.revision:
+            return False
+        if seen:
+            if seen != finalized.revision - 1 or finalized.replaced is None:
+                # Revisions were skipped, so what to take back out isn't known.
+                return self._rebuild(state, finalized)
+            self._take_back(state['totals'], finalized.replaced)
+        self._add(state['totals'], finalized.driver_points)
+        state['races'][race_key] = finalized.revision
+        return True
+
+    def _rebuild(self, state, finalized):
+        """Recompute the totals from every folded race's latest snapshot."""
+        latest = {race.race_id: race for race in self._finalized.get_many(state['races'], cached=False)}
+        if finalized.race_id not in latest or latest[finalized.race_id].revision < finalized.revision:
+            latest[finalized.race_id] = finalized
+        state['races'], state['totals'] = {}, {}
+        for race in latest.values():
+            self._add(state['totals'], race.driver_points)
+            state['races'][str(race.race_id)] = race.revision
+        return True
+
+    def _fold(self, finalized_races):
+        """Fold the races into the stored totals, returning the totals and whether they changed."""
+        for attempt in range(STANDINGS_RETRIES):
+            state, etag = self._read()
+            if not [finalized for finalized in finalized_races if self._apply(state, finalized)]:
+                return state, False
+            try:
+                self._client.save_state(self._store_name, self.key, value=json.dumps(state), etag=etag,
+                                        options=FIRST_WRITE, state_metadata={'contentType': 'application/json'})
+                return state, True
+            except Exception as e:
+                if attempt == STANDINGS_RETRIES - 1:
+                    raise
+                print(f"Standings {self.key} changed while saving, retrying: {e}")
+
+    def fold(self, *finalized_races):
+        """Add finalized races to the totals, replacing older revisions of them; False if none were new."""
+        return self._fold(finalized_races)[1]
+
+    def standings(self, race_ids=()):
+        """Every player's season totals, leader first.
+
+        Any of ``race_ids`` finalized at a newer revision than the totals
+        hold is folded in first.
+        """
+        state, _ = self._read()
+        if race_ids:
+            revisions = self._finalized.revisions()
+            behind = [race_id for race_id in race_ids
+                      if revisions.get(int(race_id), 0) > state['races'].get(str(race_id), 0)]
+            if behind:
+                try:
+                    state, _ = self._fold(self._finalized.get_many(behind, cached=False))
+                except Exception as e:
+                    print(f"Error folding finalized races into {self.key}: {e}")
+        rows = [SeasonStanding(**total) for total in state['totals'].values() if total['races']]
+        rows.sort(key=lambda row: (row.points, row.playoff_points), reverse=True)
+        return rows
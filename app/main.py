@@ -1,36 +1,85 @@
+import asyncio
 from typing import Annotated
 from datetime import datetime, UTC
 
 from fastapi import FastAPI, Depends, Response, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastui.forms import SelectSearchResponse, fastui_form
 from fastui import FastUI, AnyComponent, prebuilt_html, components as c
 from fastui.components.display import DisplayMode, DisplayLookup
 from fastui.events import GoToEvent, BackEvent
 from pydantic import BaseModel, Field
 
+from app.dependencies.cache import caches
 from app.dependencies.nascar import (
-    check_admin_user, 
-    get_player_interface, 
-    get_driver_picks, 
-    get_full_race_schedule_model,
-    race_started,
-    get_driver_position,
-    get_driver_points, 
-    get_players, 
-    get_all_cup_drivers_pick_options, 
-    publish_driver_picks, 
-    publish_user,
-    delete_player
+    check_admin_user_async,
+    get_player_interface_async,
+    get_async_dapr_client,
+    close_async_dapr_client,
+    get_driver_picks_async,
+    get_driver_registry_async,
+    get_full_race_schedule_model_async,
+    race_started_async,
+    get_driver_points_async,
+    get_driver_position_async,
+    rescore_race,
+    finalized_races,
+    get_season_standings,
+    get_players_async,
+    get_all_cup_drivers_pick_options_async,
+    publish_driver_picks_async,
+    publish_user_async,
+    delete_player_async,
+    feed_cache,
+    feed_client,
+    picks_queue,
+    backfill_notification_recipients_async,
+    backfill_picks_manifests_async
 )
+from app.dependencies.live import live_board, run_live_poller, race_event_stream, LIVE_POLLER_ENABLED
 from app.models.nascar import DriverSelectForm, UserForm, Player
 
 app = FastAPI()
 
+
+live_poller_task = None
+recipients_backfill_task = None
+picks_manifests_backfill_task = None
+
+
+@app.on_event("startup")
+async def start_live_poller():
+    global live_poller_task
+    if LIVE_POLLER_ENABLED:
+        live_poller_task = asyncio.create_task(run_live_poller())
+
+
+@app.on_event("startup")
+async def start_recipients_backfill():
+    global recipients_backfill_task
+    recipients_backfill_task = asyncio.create_task(backfill_notification_recipients_async())
+
+
+@app.on_event("startup")
+async def start_picks_manifests_backfill():
+    global picks_manifests_backfill_task
+    picks_manifests_backfill_task = asyncio.create_task(backfill_picks_manifests_async())
+
+
+@app.on_event("shutdown")
+async def close_feed_client():
+    if live_poller_task:
+        live_poller_task.cancel()
+    await feed_client.close()
+    # Queued picks are written before the state store client goes away.
+    await picks_queue.close()
+    await close_async_dapr_client()
+
+
 @app.get("/api/", response_model=FastUI, response_model_exclude_none=True)
-async def get_schedule(player: Player = Depends(get_player_interface)) -> list[AnyComponent]:
+async def get_schedule(player: Player = Depends(get_player_interface_async)) -> list[AnyComponent]:
     """Get NASCAR Schedule"""
-    schedule = get_full_race_schedule_model(one_week_in_future_only=True)
+    schedule = await get_full_race_schedule_model_async(one_week_in_future_only=True)
     return [
         c.Page(
             components=[
@@ -39,6 +88,10 @@ async def get_schedule(player: Player = Depends(get_player_interface)) -> list[A
                         c.Link(
                             components=[c.Text(text='Manage Users')],
                             on_click=GoToEvent(url='/users/'),
+                        ),
+                        c.Link(
+                            components=[c.Text(text='Season Standings')],
+                            on_click=GoToEvent(url='/standings/'),
                         )
                     ],
                 ),
@@ -64,12 +117,14 @@ async def get_schedule(player: Player = Depends(get_player_interface)) -> list[A
 
 
 @app.get("/api/picks/{race_id}/", response_model=FastUI, response_model_exclude_none=True)
-def form_content(race_id: str, player: Player = Depends(get_player_interface)):
+async def form_content(race_id: str, player: Player = Depends(get_player_interface_async)):
     if type(player) == Response:
         return player
-    current_picks = get_driver_picks(race_id, player.id)
-    current_race = get_full_race_schedule_model(int(race_id))
-    started = race_started(race_id)
+    current_picks, current_race, started = await asyncio.gather(
+        get_driver_picks_async(race_id, player.id),
+        get_full_race_schedule_model_async(int(race_id)),
+        race_started_async(race_id),
+    )
     print(current_picks)
 
     components = [
@@ -100,7 +155,7 @@ def form_content(race_id: str, player: Player = Depends(get_player_interface)):
         if current_picks.root:
             components += [
                 c.Table(
-                    data=current_picks.root[0].picks,
+                    data=current_picks[0].hydrate(await get_driver_registry_async()).picks,
                     columns=[
                         DisplayLookup(field='Full_Name'),
                         DisplayLookup(field='Badge'),
@@ -128,25 +183,32 @@ def form_content(race_id: str, player: Player = Depends(get_player_interface)):
 
 
 @app.post('/api/picks/{race_id}/', response_model=FastUI, response_model_exclude_none=True)
-async def select_form_post(race_id: str, form: Annotated[DriverSelectForm, fastui_form(DriverSelectForm)], player: Player = Depends(get_player_interface)):
-    publish_driver_picks(player.id, race_id, form)
-    return [c.FireEvent(event=GoToEvent(url=f'/thanks/{race_id}/'), message="Thank you for your picks!!")]
+async def select_form_post(race_id: str, form: Annotated[DriverSelectForm, fastui_form(DriverSelectForm)], player: Player = Depends(get_player_interface_async)):
+    receipt = await publish_driver_picks_async(player.id, race_id, form)
+    return [c.FireEvent(event=GoToEvent(url=f'/thanks/{race_id}/'), message=f"Thank you for your picks!! Saved {receipt.pick_time}")]
 
 
 @app.get("/api/thanks/{race_id}/", response_model=FastUI, response_model_exclude_none=True)
-def thanks(race_id: str, player: Player = Depends(get_player_interface)):
+async def thanks(race_id: str, player: Player = Depends(get_player_interface_async)):
     return [c.FireEvent(event=GoToEvent(url=f'/picks/{race_id}/', message="Thank you for your picks!!"))]
 
 
 @app.get("/api/races/{race_id}/", response_model=FastUI, response_model_exclude_none=True)
-def user_profile(race_id: int, player: Player = Depends(get_player_interface)):
+async def user_profile(race_id: int, player: Player = Depends(get_player_interface_async)):
     """
     User profile page, the frontend will fetch this when the user visits `/user/{id}/`.
     """
     # results = get_results(race_id)
-    results = get_driver_position(race_id)
-    driver_points = get_driver_points(race_id)
-    current_race = get_full_race_schedule_model(race_id)
+    finalized = await finalized_races.aget(race_id, get_async_dapr_client())
+    snapshot = live_board.fresh(race_id)
+    if finalized:
+        results, driver_points = finalized.results, finalized.driver_points
+    elif snapshot:
+        results, driver_points = snapshot.results, snapshot.driver_points
+    else:
+        # Both read lap-times.json; run together they share one feed fetch.
+        driver_points, results = await asyncio.gather(get_driver_points_async(race_id), get_driver_position_async(race_id))
+    current_race = await get_full_race_schedule_model_async(race_id)
 
     components = []
     components += [
@@ -218,17 +280,72 @@ def user_profile(race_id: int, player: Player = Depends(get_player_interface)):
     ]
 
 
+@app.get("/api/races/{race_id}/stream/")
+async def race_stream(race_id: int, player: Player = Depends(get_player_interface_async)) -> StreamingResponse:
+    """
+    Server-sent events with the live leaderboard and running order, pushed only when they change.
+    """
+    return StreamingResponse(
+        race_event_stream(race_id),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.get("/api/standings/", response_model=FastUI, response_model_exclude_none=True)
+async def standings(player: Player = Depends(get_player_interface_async)):
+    """Season totals over every finalized race."""
+    rows = await asyncio.to_thread(get_season_standings)
+    components = [
+        c.Link(
+            components=[c.Text(text='Back to Schedule')],
+            on_click=GoToEvent(url='/'),
+        ),
+        c.Heading(text='Season Standings', level=1),
+    ]
+    if rows:
+        components += [
+            c.Table(
+                data=rows,
+                columns=[
+                    DisplayLookup(field='name'),
+                    DisplayLookup(field='points'),
+                    DisplayLookup(field='playoff_points'),
+                    DisplayLookup(field='penalties'),
+                    DisplayLookup(field='races'),
+                ]
+            )
+        ]
+    else:
+        components += [
+            c.Text(text="No races have been finalized yet.")
+        ]
+    return [
+        c.Page(
+            components=components
+        )
+    ]
+
+
+@app.get("/api/races/{race_id}/rescore/", response_model=FastUI, response_model_exclude_none=True)
+def rescore(race_id: int, admin: Player = Depends(check_admin_user_async)):
+    """Re-score a race from fresh feeds, e.g. after a penalty, replacing its finalized results."""
+    rescore_race(race_id)
+    live_board.invalidate(race_id)
+    return [c.FireEvent(event=GoToEvent(url=f'/races/{race_id}/'))]
+
+
 @app.get("/api/races/{race_id}/drivers/", response_model=SelectSearchResponse)
-def user_profile(q: str, race_id: int, player: Player = Depends(get_player_interface)) -> SelectSearchResponse:
+async def user_profile(q: str, race_id: int, qualified_only: bool = False, player: Player = Depends(get_player_interface_async)) -> SelectSearchResponse:
     """
     User profile page, the frontend will fetch this when the user visits `/user/{id}/`.
     """
-    return get_all_cup_drivers_pick_options(q)
+    return await get_all_cup_drivers_pick_options_async(q, race_id=race_id, qualified_only=qualified_only)
 
 
 @app.get("/api/users/", response_model=FastUI, response_model_exclude_none=True)
-def user_form(player: str = Depends(check_admin_user), edit_player_id: str = None):
-    players = get_players()
+async def user_form(player: str = Depends(check_admin_user_async), edit_player_id: str = None):
+    players = await get_players_async()
     edit_player = None
     if edit_player_id:
         for player in players:
@@ -261,12 +378,12 @@ def user_form(player: str = Depends(check_admin_user), edit_player_id: str = Non
     ]
 
 @app.get("/api/users/edit/", response_model=FastUI, response_model_exclude_none=True)
-def user_created(edit_player_id: str, player: Player = Depends(get_player_interface)):
+async def user_created(edit_player_id: str, player: Player = Depends(get_player_interface_async)):
     return [c.FireEvent(event=GoToEvent(url=f'/users/?edit_player_id={edit_player_id}'))]
 
 @app.get("/api/users/json", response_model=SelectSearchResponse)
-def user_form(player: str = Depends(check_admin_user), format: str = None):
-    players = get_players()
+async def user_form(player: str = Depends(check_admin_user_async), format: str = None):
+    players = await get_players_async()
     player_json = [{'value': player.id, 'label': player.name}
                    for player in players]
     all_player_options = [
@@ -279,20 +396,20 @@ def user_form(player: str = Depends(check_admin_user), format: str = None):
 
 
 @app.post("/api/users/create/", response_model=FastUI, response_model_exclude_none=True)
-def manage_users(form: Annotated[UserForm, fastui_form(UserForm)], player: Player = Depends(get_player_interface)):
-    publish_user(form)
+async def manage_users(form: Annotated[UserForm, fastui_form(UserForm)], player: Player = Depends(get_player_interface_async)):
+    await publish_user_async(form)
     return [c.FireEvent(event=GoToEvent(url='/user_created/'))]
 
 
 @app.get("/api/user_created/", response_model=FastUI, response_model_exclude_none=True)
-def user_created(player: Player = Depends(get_player_interface)):
+async def user_created(player: Player = Depends(get_player_interface_async)):
     return [c.FireEvent(event=GoToEvent(url=f'/users/'))]
 
 
 @app.get("/api/users/delete/{user_id}/", response_model=FastUI, response_model_exclude_none=True)
-def delete_user_confirm(user_id: str, admin: Player = Depends(check_admin_user)):
+async def delete_user_confirm(user_id: str, admin: Player = Depends(check_admin_user_async)):
     """Show delete confirmation page."""
-    players = get_players()
+    players = await get_players_async()
     user_to_delete = next((player for player in players if player.id == user_id), None)
     if not user_to_delete:
         raise HTTPException(status_code=404, detail="User not found")
@@ -318,9 +435,9 @@ def delete_user_confirm(user_id: str, admin: Player = Depends(check_admin_user))
 
 
 @app.get("/api/users/delete_confirmed/{user_id}/", response_model=FastUI, response_model_exclude_none=True)
-def delete_user_confirmed(user_id: str, admin: Player = Depends(check_admin_user)):
+async def delete_user_confirmed(user_id: str, admin: Player = Depends(check_admin_user_async)):
     """Actually delete the user after confirmation."""
-    if delete_player(user_id):
+    if await delete_player_async(user_id):
         return [c.FireEvent(event=GoToEvent(url='/users/'))]
     else:
         return [
@@ -337,15 +454,27 @@ def delete_user_confirmed(user_id: str, admin: Player = Depends(check_admin_user
         ]
 
 @app.delete("/api/users/{user_id}/", response_model=FastUI, response_model_exclude_none=True)
-def delete_user(user_id: str, admin: Player = Depends(check_admin_user)):
+async def delete_user(user_id: str, admin: Player = Depends(check_admin_user_async)):
     """Delete a user. Only admins can delete users."""
-    if delete_player(user_id):
+    if await delete_player_async(user_id):
         return [c.FireEvent(event=GoToEvent(url='/users/'))]
     else:
         raise HTTPException(status_code=500, detail="Failed to delete user")
 
 
+@app.get("/api/metrics/feeds")
+def feed_metrics(race_id: int = None):
+    """Cache and revalidation counters for the cf.nascar.com feeds, optionally for one race."""
+    return feed_cache.stats(match=f'/{race_id}/' if race_id else None)
+
+
+@app.get("/api/metrics/caches")
+def cache_metrics():
+    """Hit, miss, eviction and invalidation counters for each in-process cache namespace."""
+    return caches.stats()
+
+
 @app.get('/{path:path}')
-async def html_landing(player: Player = Depends(get_player_interface)) -> HTMLResponse:
+async def html_landing(player: Player = Depends(get_player_interface_async)) -> HTMLResponse:
     """Simple HTML page which serves the React app, comes last as it matches all paths."""
     return HTMLResponse(prebuilt_html(title='FastUI Demo'))
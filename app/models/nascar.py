@@ -376,6 +376,7 @@ class WeekendFeed(BaseModel):
 
 class DriverPoints(BaseModel):
     picks: List[PickPoints] = []
+    player: str = ""
     name: str = ""
     stage_points: int = 0
     position_points: int = 0
@@ -480,6 +481,15 @@ class PickPoints(BaseModel):
     position_points: int = 0
 
 
+class SeasonStanding(BaseModel):
+    player: str
+    name: str = ""
+    points: int = 0
+    playoff_points: int = 0
+    penalties: int = 0
+    races: int = 0
+
+
 class Lap(BaseModel):
     Lap: int
     LapTime: Optional[float]
@@ -506,6 +516,25 @@ class LapTimes(BaseModel):
     flags: List[Flag]
 
 
+class PositionSummary(BaseModel):
+    """A driver's entry in the lap-times feed without the per-lap history."""
+    Number: str
+    FullName: str
+    Manufacturer: str
+    RunningPos: int
+    NASCARDriverID: int
+
+
+class LapTimesSummary(BaseModel):
+    """Running order and flags from the lap-times feed.
+
+    Validating this skips every driver's ``Laps`` list, which is nearly all
+    of the feed. Use LapTimes when the lap history is actually needed.
+    """
+    laps: List[PositionSummary]
+    flags: List[Flag]
+
+
 class Result(BaseModel):
     position: int
     vehicle_number: str
@@ -17,39 +17,64 @@ from twilio.rest import Client
 from app.dependencies.nascar import (
     get_full_race_schedule_model
 )
+from app.dependencies.recipients import READY_KEY
+from app.dependencies.sms import SmsDispatcher
 
 connection_string = os.getenv("CONNECTION_STRING")
+# Log messages instead of sending them, for trying the job without Twilio.
+SMS_STUB = os.getenv("SMS_STUB", "false").lower() == "true"
+FROM_NUMBER = '+18335431795'
 
-twilio_client = Client()
+# Dapr prefixes state keys with the app id.
+STATE_KEY_PREFIX = 'nascarpicks||'
+RECIPIENTS_QUERY = "SELECT value->>'name', value->>'phone_number', value->>'hash' FROM public.state WHERE key >= %s AND key < %s;"
+# Before the app has filled the recipients in.
+OPTED_IN_PLAYERS_QUERY = "SELECT value->>'name', value->>'phone_number', value->>'hash' FROM public.state WHERE key LIKE 'nascarpicks||player-%' AND (value->>'text_notifications')::BOOL;"
 
-upcoming_races = get_full_race_schedule_model(one_week_in_future_only=True, text_notifications_only=True)
 
-if upcoming_races:
-    
-    next_race = upcoming_races[-1]
+def send_sms(to, body):
+    message = twilio_client.messages.create(
+        from_=FROM_NUMBER,
+        body=body,
+        to=to
+    )
+    print(message.sid)
 
-    conn = psycopg2.connect(connection_string)
 
-    with conn.cursor() as cur:
-        cur.execute("SELECT value FROM public.state WHERE key LIKE 'nascarpicks||player-%';")
-        players = cur.fetchall()
-        conn.commit()
+def print_sms(to, body):
+    print(f"{to}: {body}")
 
-        for player in players:
-            player = player[0]
-            if player['text_notifications']:
-                print(player['phone_number'])
-                message = f"NASCAR Picks League! Make your picks for the {next_race.race_name} at {next_race.track_name}: https://nascar-frontend-demo.lemonbush-6bcc1f8d.eastus.azurecontainerapps.io/picks/{next_race.race_id}/?player_id={player['hash']}\n\nWhen the race starts, watch the live points here: https://nascar-frontend-demo.lemonbush-6bcc1f8d.eastus.azurecontainerapps.io/races/{next_race.race_id}/?player_id={player['hash']}"
-                print(message)
-                # if player['name'] == "Chase Billing":
-                message = twilio_client.messages.create(
-                    from_='+18335431795',
-                    body=message,
-                    to=f"+1{player['phone_number']}"
-                )
-                print(message.sid)
 
+twilio_client = None if SMS_STUB else Client()
 
+upcoming_races = get_full_race_schedule_model(one_week_in_future_only=True, text_notifications_only=True)
 
+if upcoming_races:
+    
+    next_race = upcoming_races[-1]
 
+    conn = psycopg2.connect(connection_string)
 
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM public.state WHERE key = %s;", (STATE_KEY_PREFIX + READY_KEY,))
+        recipients_ready = cur.fetchone() is not None
+
+    # Streamed from a server-side cursor; only the opted-in players' name, number and hash are read.
+    cur = conn.cursor(name='recipients')
+    cur.itersize = 500
+    if recipients_ready:
+        # '.' sorts right after '-', so this is a primary-key range over the recipient-* keys.
+        cur.execute(RECIPIENTS_QUERY, (STATE_KEY_PREFIX + 'recipient-', STATE_KEY_PREFIX + 'recipient.'))
+    else:
+        cur.execute(OPTED_IN_PLAYERS_QUERY)
+
+    messages = (
+        (f"+1{phone_number}", f"NASCAR Picks League! Make your picks for the {next_race.race_name} at {next_race.track_name}: https://nascar-frontend-demo.lemonbush-6bcc1f8d.eastus.azurecontainerapps.io/picks/{next_race.race_id}/?player_id={player_hash}\n\nWhen the race starts, watch the live points here: https://nascar-frontend-demo.lemonbush-6bcc1f8d.eastus.azurecontainerapps.io/races/{next_race.race_id}/?player_id={player_hash}")
+        for name, phone_number, player_hash in cur
+    )
+
+    summary = SmsDispatcher(print_sms if SMS_STUB else send_sms).run(messages)
+    cur.close()
+    conn.commit()
+    conn.close()
+    print(summary)
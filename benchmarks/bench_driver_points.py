@@ -0,0 +1,251 @@
+"""Race page scoring latency: serial fetches vs the thread-pool loader vs asyncio.gather.
+
+Serves the feeds from a local HTTP server and the picks/players from an
+in-process state-store stub, each adding DELAY_MS per round trip, so the
+numbers show how many round trips end up on the critical path. The last
+run makes lap-times take SLOW_MS and shows the async pipeline falling back
+to the last good lap times after SOURCE_TIMEOUT_SECONDS instead of waiting.
+
+Run from the repository root with ``python -m benchmarks.bench_driver_points``.
+"""
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+os.environ.setdefault('SOURCE_TIMEOUT_SECONDS', '0.3')
+
+from app.dependencies import nascar
+from app.dependencies.feeds import FeedClient
+from app.dependencies.finalized import FinalizedRaceStore
+from app.dependencies.loader import DataLoader
+from app.dependencies.picks import PicksStore
+
+ROOT = os.path.join(os.path.dirname(__file__), os.pardir)
+DELAY_MS = 40
+SLOW_MS = 2000
+ROUNDS = 15
+RACE_ID, PREVIOUS_RACE_ID = 5386, 5408
+
+
+def load(*path):
+    with open(os.path.join(ROOT, *path), 'r') as file:
+        return json.load(file)
+
+
+def schedule_item(race_id, race_name, start):
+    return {
+        'race_id': race_id, 'event_name': 'Race', 'race_name': race_name, 'start_time': '', 'end_time': '',
+        'track_id': 1, 'track_name': 'Track', 'series_id': 1, 'run_type': 3,
+        'start_time_utc': start.strftime("%Y-%m-%dT%H:%M:%S"),
+        'end_time_utc': (start + timedelta(hours=4)).strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+now = datetime.now(UTC).replace(tzinfo=None)
+FEEDS = {
+    'schedule-feed.json': [
+        schedule_item(5400, 'DAYTONA 500', now - timedelta(days=14)),
+        schedule_item(PREVIOUS_RACE_ID, 'Previous Race', now - timedelta(days=7)),
+        schedule_item(RACE_ID, 'Current Race', now - timedelta(hours=3)),
+    ],
+    'lap-times.json': load('variables', 'positions.json'),
+    'live-stage-points.json': load('variables', 'all_drivers_stage_points.json'),
+    'weekend-feed.json': load('examples', 'results.json'),
+    'drivers.json': load('examples', 'drivers.json'),
+}
+slow_paths = set()
+
+
+class StubFeedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        name = self.path.rsplit('/', 1)[-1]
+        time.sleep((SLOW_MS if name in slow_paths else DELAY_MS) / 1000)
+        body = json.dumps(FEEDS[name]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubFeedClient(FeedClient):
+    """Sends the cf.nascar.com URLs to the local stub server."""
+
+    def __init__(self, base_url):
+        super().__init__(timeout=10, max_connections=10)
+        self.base_url = base_url
+
+    def fetch_sync(self, url, validators=None):
+        return super().fetch_sync(url.replace('https://cf.nascar.com', self.base_url), validators)
+
+    async def fetch(self, url, validators=None):
+        return await super().fetch(url.replace('https://cf.nascar.com', self.base_url), validators)
+
+
+class StubStateClient:
+    """The picks, picks manifests and players by key, with a round trip's delay."""
+
+    def __init__(self):
+        self.picks = []
+        for race_id, name in [(RACE_ID, 'player_picks.json'), (PREVIOUS_RACE_ID, 'previous_race_picks.json')]:
+            records = load('variables', name)
+            for record in records if isinstance(records, list) else [records]:
+                self.picks.append(dict(record, race=str(race_id), picks=[str(pick['Nascar_Driver_ID']) for pick in record['picks']]))
+        self.players = {
+            record['player']: {'id': record['player'], 'hash': record['player'], 'name': record['player'],
+                               'phone_number': '5555555555', 'type': 'player', 'admin': False}
+            for record in self.picks
+        }
+        self.values = dict(self.players)
+        for race_id in [RACE_ID, PREVIOUS_RACE_ID]:
+            keys = [PicksStore.key(item['player'], item['race']) for item in self.picks if item['race'] == str(race_id)]
+            self.values[PicksStore.manifest_key(race_id)] = {'type': 'race-picks', 'race': str(race_id), 'keys': keys}
+        for item in self.picks:
+            self.values[PicksStore.key(item['player'], item['race'])] = item
+
+    def record(self, data, key=None):
+        encoded = json.dumps(data).encode() if data is not None else b''
+        return SimpleNamespace(key=key, data=encoded, etag='1', json=lambda: json.loads(encoded))
+
+    def query_state(self, store_name, query):
+        time.sleep(DELAY_MS / 1000)
+        race_filter = json.loads(query)['filter']['AND'][0]
+        races = race_filter['IN']['race'] if 'IN' in race_filter else [race_filter['EQ']['race']]
+        return SimpleNamespace(results=[self.record(item) for item in self.picks if item['race'] in races])
+
+    def get_bulk_state(self, store_name, keys):
+        time.sleep(DELAY_MS / 1000)
+        return SimpleNamespace(items=[self.record(self.values.get(key), key) for key in keys])
+
+    def get_state(self, store_name, key):
+        time.sleep(DELAY_MS / 1000)
+        return self.record(self.values.get(key), key)
+
+    def save_state(self, *args, **kwargs):
+        pass
+
+
+class AsyncStubStateClient:
+    """StubStateClient behind the dapr.aio interface; ``blocking`` sleeps on the event loop instead of awaiting."""
+
+    def __init__(self, state, blocking=False):
+        self.state = state
+        self.blocking = blocking
+        self.players_by_hash = {player['hash']: player for player in state.players.values()}
+
+    async def delay(self):
+        if self.blocking:
+            time.sleep(DELAY_MS / 1000)
+        else:
+            await asyncio.sleep(DELAY_MS / 1000)
+
+    async def query_state(self, store_name, query):
+        await self.delay()
+        player = self.players_by_hash.get(json.loads(query)['filter']['EQ'].get('hash'))
+        return SimpleNamespace(results=[self.state.record(player)] if player else [])
+
+    async def get_bulk_state(self, store_name, keys):
+        await self.delay()
+        return SimpleNamespace(items=[self.state.record(self.state.values.get(key), key) for key in keys])
+
+    async def get_state(self, store_name, key):
+        await self.delay()
+        return self.state.record(self.state.values.get(key), key)
+
+    async def save_state(self, *args, **kwargs):
+        await self.delay()
+
+    async def delete_state(self, *args, **kwargs):
+        await self.delay()
+
+
+class SerialLoader(DataLoader):
+    """What get_driver_points did before the loader: one fetch after another."""
+
+    def prefetch(self, *calls):
+        pass
+
+
+def cold_start():
+    # Each round pays for every round trip, as on a cache miss.
+    nascar.feed_cache.invalidate()
+    nascar.player_cache.invalidate()
+    nascar.previous_picks_indexes.clear()
+    nascar.race_status.reset()
+    nascar.finalized_races = FinalizedRaceStore(state_client, nascar.STATE_STORE)
+    nascar.picks_store = PicksStore(state_client, nascar.STATE_STORE)
+
+
+def p50(timings):
+    return statistics.median(timings) * 1000
+
+
+def time_sync(func):
+    timings = []
+    for _ in range(ROUNDS):
+        cold_start()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return p50(timings)
+
+
+async def time_async():
+    timings = []
+    for _ in range(ROUNDS):
+        cold_start()
+        start = time.perf_counter()
+        await nascar.get_driver_points_async(RACE_ID)
+        timings.append(time.perf_counter() - start)
+    return p50(timings)
+
+
+async def time_async_slow_lap_times():
+    await nascar.get_driver_points_async(RACE_ID)
+    slow_paths.add('lap-times.json')
+    try:
+        nascar.feed_cache.invalidate(nascar.lap_times_url(RACE_ID))
+        start = time.perf_counter()
+        await nascar.get_driver_points_async(RACE_ID)
+        return (time.perf_counter() - start) * 1000
+    finally:
+        slow_paths.clear()
+
+
+async def run_async():
+    try:
+        return await time_async(), await time_async_slow_lap_times()
+    finally:
+        await nascar.feed_client.close()
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubFeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    nascar.feed_client = StubFeedClient(f'http://127.0.0.1:{server.server_port}')
+    state_client = StubStateClient()
+    nascar.dapr_client = state_client
+    async_state_client = AsyncStubStateClient(state_client)
+    nascar.get_async_dapr_client = lambda: async_state_client
+
+    serial = time_sync(lambda: nascar.get_driver_points(RACE_ID, loader=SerialLoader()))
+    threaded = time_sync(lambda: nascar.get_driver_points(RACE_ID))
+    gathered, slow = asyncio.run(run_async())
+    server.shutdown()
+
+    print(f"{DELAY_MS} ms per round trip, p50 of {ROUNDS} cold runs")
+    print(f"serial fetches            {serial:7.1f} ms")
+    print(f"DataLoader thread pool    {threaded:7.1f} ms")
+    print(f"asyncio.gather            {gathered:7.1f} ms")
+    print(f"lap-times {SLOW_MS} ms, async   {slow:7.1f} ms (last good lap times after {os.environ['SOURCE_TIMEOUT_SECONDS']} s)")
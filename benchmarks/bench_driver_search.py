@@ -0,0 +1,66 @@
+"""Per-keystroke latency of the driver search box, p50/p99.
+
+Replays typing (and backspacing) a few driver names against examples/drivers.json
+with the previous linear scan that built a Driver model per match, with the
+n-gram index alone (uncached) and with DriverRegistry.pick_options (cached
+payloads).
+
+Run from the repository root with ``python -m benchmarks.bench_driver_search``.
+"""
+import json
+import os
+import statistics
+import time
+
+from fastui.forms import SelectSearchResponse
+
+from app.dependencies.drivers import DriverRegistry
+from app.models.nascar import Driver
+
+DRIVERS_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'examples', 'drivers.json')
+NAMES = ['kyle larson', 'chase elliott', 'denny hamlin', 'bell', 'suarez', 'blaney']
+ROUNDS = 50
+
+
+def keystrokes():
+    for name in NAMES:
+        for end in range(1, len(name) + 1):
+            yield name[:end]
+        for end in range(len(name) - 1, 0, -1):
+            yield name[:end]
+
+
+def linear_pick_options(drivers_feed, query):
+    drivers = [Driver(**item) for item in drivers_feed['response']
+               if item['Crew_Chief'] and (not query or query.lower() in item['Full_Name'].lower())]
+    drivers = sorted(drivers, key=lambda x: x.Full_Name)
+    options = [{'label': driver.Full_Name, 'value': str(driver.Nascar_Driver_ID)} for driver in drivers]
+    return SelectSearchResponse(options=[{'label': 'Drivers', 'options': options}])
+
+
+def indexed_pick_options(registry, query):
+    options = [{'label': item['Full_Name'], 'value': str(item['Nascar_Driver_ID'])}
+               for item in registry.typeahead(query)]
+    return SelectSearchResponse(options=[{'label': 'Drivers', 'options': options}])
+
+
+def report(name, search):
+    latencies = []
+    for _ in range(ROUNDS):
+        for query in keystrokes():
+            start = time.perf_counter()
+            search(query)
+            latencies.append((time.perf_counter() - start) * 1_000_000)
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f"{name:<10} p50 {percentiles[49]:9.1f} us   p99 {percentiles[98]:9.1f} us")
+
+
+if __name__ == "__main__":
+    with open(DRIVERS_PATH, 'r') as file:
+        drivers_feed = json.load(file)
+
+    print(f"{len(list(keystrokes()))} keystrokes x {ROUNDS} rounds")
+    report('linear', lambda query: linear_pick_options(drivers_feed, query))
+    registry = DriverRegistry(drivers_feed)
+    report('indexed', lambda query: indexed_pick_options(registry, query))
+    report('cached', registry.pick_options)
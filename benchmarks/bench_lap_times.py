@@ -0,0 +1,43 @@
+"""Time and peak memory of turning variables/positions.json bytes into LapTimes vs LapTimesSummary.
+
+Every row starts from the undecoded feed body, as the feed cache holds it,
+so the JSON decode is part of the cost. The last row is what
+get_driver_position does: validate the summary straight from the bytes
+without ever building the feed as a dict.
+
+Run from the repository root with ``python -m benchmarks.bench_lap_times``.
+"""
+import json
+import os
+import timeit
+import tracemalloc
+
+from app.models.nascar import LapTimes, LapTimesSummary
+
+POSITIONS_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'variables', 'positions.json')
+ROUNDS = 20
+
+
+def measure(name, parse, body):
+    seconds = min(timeit.repeat(lambda: parse(body), number=1, repeat=ROUNDS))
+    tracemalloc.start()
+    model = parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<30} {seconds * 1000:8.2f} ms {peak / 1024:10.0f} KiB peak")
+    return model
+
+
+if __name__ == "__main__":
+    with open(POSITIONS_PATH, 'rb') as file:
+        body = file.read()
+
+    positions = json.loads(body)
+    drivers = len(positions['laps'])
+    laps = sum(len(position['Laps']) for position in positions['laps'])
+    del positions
+    print(f"{len(body) / 1024:.0f} KiB body, {drivers} drivers, {laps} laps (best of {ROUNDS})")
+    measure('json.loads', json.loads, body)
+    measure('json.loads + LapTimes', lambda raw: LapTimes.model_validate(json.loads(raw)), body)
+    measure('json.loads + LapTimesSummary', lambda raw: LapTimesSummary.model_validate(json.loads(raw)), body)
+    measure('LapTimesSummary from bytes', LapTimesSummary.model_validate_json, body)
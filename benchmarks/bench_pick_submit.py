@@ -0,0 +1,101 @@
+"""A burst of pick submissions: one write per submission vs the batching PicksWriteQueue.
+
+SUBMISSIONS players submit at once for the same race against an in-process
+async state store stub that takes DELAY_MS per call and enforces etags on
+the race's picks manifest the way first-write concurrency does.
+
+Run from the repository root with ``python -m benchmarks.bench_pick_submit``.
+"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from app.dependencies.picks import PicksStore
+from app.dependencies.picks_queue import PicksWriteQueue
+from benchmarks.bench_driver_points import DELAY_MS
+
+SUBMISSIONS = 200
+RACE_ID = 5386
+
+
+class AsyncWriteStubStateClient:
+    def __init__(self):
+        self.values = {}
+        self.etags = {}
+        self.calls = 0
+
+    async def delay(self):
+        self.calls += 1
+        await asyncio.sleep(DELAY_MS / 1000)
+
+    async def get_state(self, store_name, key):
+        await self.delay()
+        data = self.values.get(key, b'')
+        return SimpleNamespace(data=data, etag=self.etags.get(key, ''), json=lambda: json.loads(data))
+
+    async def query_state(self, store_name, query):
+        await self.delay()
+        return SimpleNamespace(results=[])
+
+    async def save_state(self, store_name, key, value, etag=None, options=None, state_metadata=None):
+        await self.delay()
+        # First-write concurrency: an etag must match, no etag only creates.
+        if options is not None and etag != self.etags.get(key):
+            raise RuntimeError('possible etag mismatch')
+        self.values[key] = value.encode()
+        self.etags[key] = str(int(self.etags.get(key) or 0) + 1)
+
+    async def save_bulk_state(self, store_name, states):
+        await self.delay()
+        for state in states:
+            self.values[state.key] = state.value.encode()
+
+
+def submissions():
+    for index in range(SUBMISSIONS):
+        player = f'player-{index}'
+        yield PicksStore.key(player, RACE_ID), {'player': player, 'race': str(RACE_ID), 'type': 'picks',
+                                                'picks': ['4030'], 'pick_time': '2024-04-10T12:00:00'}
+
+
+async def burst(submit):
+    client = AsyncWriteStubStateClient()
+    latencies = []
+
+    async def one(key, payload):
+        start = time.perf_counter()
+        try:
+            await submit(key, payload, client)
+        except Exception:
+            return False
+        latencies.append(time.perf_counter() - start)
+        return True
+
+    start = time.perf_counter()
+    saved = sum(await asyncio.gather(*(one(key, payload) for key, payload in submissions())))
+    elapsed = time.perf_counter() - start
+    listed = len(json.loads(client.values.get(PicksStore.manifest_key(RACE_ID), b'{"keys": []}'))['keys'])
+    latencies.sort()
+    return saved, listed, client.calls, elapsed * 1000, latencies[len(latencies) // 2] * 1000 if latencies else 0
+
+
+async def main():
+    store = PicksStore(None, 'statestore')
+    queue = PicksWriteQueue(store)
+
+    async def direct(key, payload, client):
+        await store.asave_many({key: payload}, client)
+
+    async def queued(key, payload, client):
+        await queue.submit(key, payload, client)
+
+    print(f"{SUBMISSIONS} submissions at once, {DELAY_MS} ms per state store call")
+    for name, submit in [('one write each', direct), ('PicksWriteQueue', queued)]:
+        saved, listed, calls, elapsed, p50 = await burst(submit)
+        print(f"{name:16} saved {saved:3}  in manifest {listed:3}  {calls:5} calls  {elapsed:7.1f} ms  p50 {p50:7.1f} ms")
+    await queue.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""Loading 500 players' stored picks as PlayerPicks of Driver models vs compact PicksRecords.
+
+Uses examples/drivers.json as the driver registry. Reports the best time
+of ROUNDS and the memory held by the loaded picks (tracemalloc).
+
+Run from the repository root with ``python -m benchmarks.bench_picks``.
+"""
+import json
+import os
+import random
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from app.dependencies.drivers import DriverRegistry
+from app.dependencies.nascar import picks_records
+from app.dependencies.picks import RacePicks
+from app.models.nascar import PlayerPicks
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+PLAYERS = 500
+ROUNDS = 5
+
+
+def hydrate_picks(results, drivers):
+    """What get_driver_picks built before: full Driver models wrapped in PicksItem/PlayerPicks."""
+    return PlayerPicks(root=[
+        {
+            key: [drivers.driver(pick_id) for pick_id in value] if key == 'picks' else value
+            for key, value in item.json().items()
+        }
+        for item in results
+    ])
+
+
+def stored_picks(drivers):
+    random.seed(1)
+    driver_ids = [str(item['Nascar_Driver_ID']) for item in drivers.entries]
+    records = []
+    for index in range(PLAYERS):
+        encoded = json.dumps({'player': f'player-{index}', 'race': '5386', 'type': 'picks',
+                              'pick_time': '2024-04-10T12:00:00', 'picks': random.sample(driver_ids, 3)})
+        records.append(SimpleNamespace(json=lambda encoded=encoded: json.loads(encoded)))
+    return records
+
+
+def measure(func):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    held = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return min(timings) * 1000, size / 1024
+
+
+if __name__ == "__main__":
+    with open(os.path.join(EXAMPLES, 'drivers.json'), 'r') as file:
+        drivers_feed = json.load(file)
+    results = stored_picks(DriverRegistry(drivers_feed))
+
+    # A fresh registry each run, as after a drivers.json refresh.
+    models = measure(lambda: hydrate_picks(results, DriverRegistry(drivers_feed)))
+    compact = measure(lambda: RacePicks(picks_records(results, DriverRegistry(drivers_feed))))
+    print(f"{PLAYERS} players, best of {ROUNDS}")
+    print(f"PlayerPicks of Driver models {models[0]:7.1f} ms {models[1]:8.1f} KiB")
+    print(f"RacePicks of PicksRecords    {compact[0]:7.1f} ms {compact[1]:8.1f} KiB")
@@ -0,0 +1,62 @@
+"""Scoring 1,000 synthetic players with calculate_points vs ScoringTable/score_players.
+
+Uses variables/positions.json and variables/all_drivers_stage_points.json as
+the feed snapshot and variables/previous_race_picks.json for repeat checks.
+
+Run from the repository root with ``python -m benchmarks.bench_scoring``.
+"""
+import json
+import os
+import random
+import time
+
+from app.dependencies.nascar import calculate_points
+from app.dependencies.scoring import ScoringTable, previous_picks_index, score_players
+from app.models.nascar import LapTimesSummary, StagePoints, PlayerPicks, PicksItem, Player
+
+VARIABLES = os.path.join(os.path.dirname(__file__), os.pardir, 'variables')
+PLAYERS = 1000
+ROUNDS = 5
+
+
+def load(name, model):
+    with open(os.path.join(VARIABLES, name), 'r') as file:
+        return model.model_validate(json.load(file))
+
+
+def best_of(func):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+if __name__ == "__main__":
+    results = load('positions.json', LapTimesSummary)
+    stage_points = load('all_drivers_stage_points.json', StagePoints)
+    previous_race_picks = load('previous_race_picks.json', PlayerPicks)
+
+    random.seed(1)
+    drivers = list({pick.Nascar_Driver_ID: pick for item in previous_race_picks for pick in item.picks}.values())
+    previous_players = [item.player for item in previous_race_picks]
+    race_picks = [
+        PicksItem(type='picks', race='5386', picks=random.sample(drivers, 3),
+                  player=previous_players[index] if index < len(previous_players) else f'player-{index}')
+        for index in range(PLAYERS)
+    ]
+    players = {
+        item.player: Player(id=item.player, hash=item.player, name=item.player, phone_number='5555555555', type='player', admin=False)
+        for item in race_picks
+    }
+
+    per_player = best_of(lambda: [
+        calculate_points(results, players[item.player].name, item, stage_points, previous_race_picks, 0)
+        for item in race_picks
+    ])
+    batched = best_of(lambda: score_players(
+        ScoringTable(results, stage_points), race_picks, players, previous_picks_index(previous_race_picks), 0))
+    print(f"{PLAYERS} players, best of {ROUNDS}")
+    print(f"calculate_points per player {per_player:8.1f} ms")
+    print(f"ScoringTable + score_players {batched:7.1f} ms")
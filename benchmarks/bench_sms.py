@@ -0,0 +1,32 @@
+"""Texting MESSAGES players one at a time vs through SmsDispatcher.
+
+A stub stands in for Twilio and takes SEND_MS per message, about what a
+messages.create round trip costs.
+
+Run from the repository root with ``python -m benchmarks.bench_sms``.
+"""
+import time
+
+from app.dependencies.sms import SmsDispatcher
+
+MESSAGES = 60
+SEND_MS = 200
+
+
+def stub_send(to, body):
+    time.sleep(SEND_MS / 1000)
+
+
+if __name__ == "__main__":
+    messages = [(f'+1555555{index:04}', 'Make your picks') for index in range(MESSAGES)]
+
+    start = time.perf_counter()
+    for to, body in messages:
+        stub_send(to, body)
+    serial = time.perf_counter() - start
+
+    print(f"{MESSAGES} messages, {SEND_MS} ms per send")
+    print(f"one at a time                 {serial:5.1f} s")
+    for concurrency, rate in [(8, 10), (8, 40)]:
+        summary = SmsDispatcher(stub_send, concurrency=concurrency, rate_per_second=rate).run(messages)
+        print(f"{concurrency} workers, {rate:>2} per second      {summary.elapsed:5.1f} s  (sent {summary.sent})")
@@ -0,0 +1,76 @@
+"""Load test of the race and picks pages on one uvicorn worker with stubbed backends.
+
+The feeds come from a local HTTP server and the state store from an
+in-process stub that takes DELAY_MS per call. Each page is driven at several
+concurrency levels, once with the stub awaiting its delay (the dapr.aio
+path the routes now use) and once with it blocking the event loop, which is
+what calling the sync Dapr client from an ``async def`` route used to do.
+
+Run from the repository root with ``python -m benchmarks.load_routes``.
+"""
+import asyncio
+import statistics
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import aiohttp
+import uvicorn
+
+from app import main
+from app.dependencies import nascar
+from benchmarks.bench_driver_points import DELAY_MS, RACE_ID, AsyncStubStateClient, StubFeedClient, StubFeedHandler, StubStateClient
+
+REQUESTS = 200
+CONCURRENCY = [1, 10, 50]
+PAGES = {'race page': f'/api/races/{RACE_ID}/', 'picks page': f'/api/picks/{RACE_ID}/'}
+
+
+async def drive(base_url, path, concurrency):
+    latencies = []
+    remaining = iter(range(REQUESTS))
+
+    async def worker(session):
+        for _ in remaining:
+            start = time.perf_counter()
+            async with session.get(base_url + path) as response:
+                await response.read()
+                assert response.status == 200, response.status
+            latencies.append(time.perf_counter() - start)
+
+    async with aiohttp.ClientSession(cookies={'player_id_cookie': player_hash}) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return REQUESTS / elapsed, statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+if __name__ == "__main__":
+    feeds = ThreadingHTTPServer(('127.0.0.1', 0), StubFeedHandler)
+    threading.Thread(target=feeds.serve_forever, daemon=True).start()
+    nascar.feed_client = StubFeedClient(f'http://127.0.0.1:{feeds.server_port}')
+    main.feed_client = nascar.feed_client
+    state = StubStateClient()
+    nascar.dapr_client = state
+    player_hash = next(iter(state.players.values()))['hash']
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=0, workers=1, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f'http://127.0.0.1:{server.servers[0].sockets[0].getsockname()[1]}'
+
+    print(f"{REQUESTS} requests per run, state store {DELAY_MS} ms per call, one worker")
+    for blocking in [True, False]:
+        client = AsyncStubStateClient(state, blocking=blocking)
+        nascar.get_async_dapr_client = main.get_async_dapr_client = lambda: client
+        nascar.player_cache.invalidate()
+        print('blocking state calls (old)' if blocking else 'dapr.aio state calls')
+        for name, path in PAGES.items():
+            asyncio.run(drive(base_url, path, 1))  # warm the feed cache
+            for concurrency in CONCURRENCY:
+                rps, p50, p95 = asyncio.run(drive(base_url, path, concurrency))
+                print(f"  {name:10} c={concurrency:<3} {rps:7.1f} req/s  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms")
+    server.should_exit = True
+    feeds.shutdown()
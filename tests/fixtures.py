@@ -1,4 +1,5 @@
 import json
+from unittest.mock import MagicMock
 
 from app.models.nascar import WeekendFeed
 
@@ -178,4 +179,66 @@ drivers = {
 with open('examples/results.json', 'r') as file:
     results = json.load(file)
 
-results_model = WeekendFeed(**results)
\ No newline at end of file
+results_model = WeekendFeed(**results)
+
+
+class FakeStateClient:
+    """In-memory state store with etags, bulk reads and EQ/IN/AND queries."""
+
+    def __init__(self):
+        self.values = {}
+        self.etags = {}
+        self.get_state = MagicMock(side_effect=self._get_state)
+        self.query_state = MagicMock(side_effect=self._query_state)
+
+    def _item(self, key):
+        data = self.values.get(key, b'')
+        return MagicMock(key=key, data=data, etag=self.etags.get(key, ''), json=lambda: json.loads(data))
+
+    def _get_state(self, store_name, key):
+        return self._item(key)
+
+    def get_bulk_state(self, store_name, keys):
+        return MagicMock(items=[self._item(key) for key in keys])
+
+    def _matches(self, data, condition):
+        (operator, operand), = condition.items()
+        if operator == 'AND':
+            return all(self._matches(data, part) for part in operand)
+        (field, value), = operand.items()
+        return data.get(field) in value if operator == 'IN' else data.get(field) == value
+
+    def _query_state(self, store_name, query):
+        condition = json.loads(query)['filter']
+        return MagicMock(results=[
+            self._item(key) for key, data in self.values.items() if self._matches(json.loads(data), condition)
+        ])
+
+    def save_state(self, store_name, key, value, etag=None, options=None, state_metadata=None):
+        # First-write concurrency: an etag must match, no etag only creates.
+        if (etag is not None or options is not None) and etag != self.etags.get(key):
+            raise RuntimeError(f'etag mismatch for {key}')
+        self.values[key] = value.encode()
+        self.etags[key] = str(int(self.etags.get(key) or 0) + 1)
+
+    def save_bulk_state(self, store_name, states):
+        for state in states:
+            self.save_state(store_name, state.key, state.value)
+
+    def delete_state(self, store_name, key):
+        self.values.pop(key, None)
+        self.etags.pop(key, None)
+
+
+class AsyncFakeStateClient:
+    """dapr.aio-style client over a FakeStateClient's values, for the async stores."""
+
+    def __init__(self, state):
+        self.state = state
+
+    def __getattr__(self, name):
+        method = getattr(self.state, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from app.dependencies.cache import CacheNamespace, CacheRegistry, FeedCache, FeedResponse, cached
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFeedCache(unittest.TestCase):
+
+    def test_hit_miss_and_stale(self):
+        clock = FakeClock()
+        cache = FeedCache(clock=clock)
+        fetch = MagicMock(side_effect=[{'version': 1}, {'version': 2}])
+
+        self.assertEqual(cache.get('url', 10, fetch), {'version': 1})
+        self.assertEqual(cache.get('url', 10, fetch), {'version': 1})
+        clock.now = 11
+        self.assertEqual(cache.get('url', 10, fetch), {'version': 2})
+
+        stats = cache.stats()['feeds']['url']
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual((stats['misses'], stats['hits'], stats['stale']), (1, 1, 1))
+
+    def test_concurrent_misses_fetch_once(self):
+        cache = FeedCache()
+        release = threading.Event()
+        calls = []
+
+        def fetch(validators):
+            calls.append(1)
+            release.wait(timeout=5)
+            return {'laps': []}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('url', 10, fetch))) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'laps': []}] * 50)
+
+    def test_failed_refresh_serves_stale_entry(self):
+        clock = FakeClock()
+        cache = FeedCache(clock=clock)
+        cache.get('url', 10, lambda validators: {'version': 1})
+        clock.now = 11
+
+        self.assertEqual(cache.get('url', 10, lambda validators: None), {'version': 1})
+        self.assertEqual(cache.stats()['feeds']['url']['stale_served'], 1)
+
+    def test_not_modified_keeps_parsed_model(self):
+        clock = FakeClock()
+        cache = FeedCache(clock=clock)
+        fetch = MagicMock(side_effect=[
+            FeedResponse(data={'laps': [1, 2]}, etag='"v1"', size=2048),
+            FeedResponse(not_modified=True),
+        ])
+        parse = MagicMock(side_effect=lambda data: list(data['laps']))
+
+        first = cache.get_model('url', 10, fetch, parse)
+        clock.now = 11
+        second = cache.get_model('url', 10, fetch, parse)
+
+        self.assertIs(first, second)
+        self.assertEqual(parse.call_count, 1)
+        fetch.assert_called_with({'If-None-Match': '"v1"'})
+        stats = cache.stats()['feeds']['url']
+        self.assertEqual((stats['not_modified'], stats['bytes_saved'], stats['parses_saved']), (1, 2048, 1))
+        self.assertEqual(cache.version('url'), 1)
+
+    def test_evicts_least_recently_used_feeds_past_max_bytes(self):
+        cache = FeedCache(max_bytes=3072)
+        for url in ('a', 'b'):
+            cache.get(url, 10, lambda validators: FeedResponse(body=b'{}', size=1024))
+        cache.get('a', 10, MagicMock())
+        cache.get('c', 10, lambda validators: FeedResponse(body=b'{}', size=1024))
+        cache.get('d', 10, lambda validators: FeedResponse(body=b'{}', size=1024))
+
+        self.assertEqual((cache.version('a'), cache.version('b'), cache.version('c'), cache.version('d')), (1, 0, 1, 1))
+        self.assertEqual(cache.stats()['bytes'], 3072)
+
+    def test_payload_is_released_once_parsed(self):
+        clock = FakeClock()
+        cache = FeedCache(clock=clock)
+        body = b'{"laps": [1, 2], "flags": []}'
+        fetch = MagicMock(return_value=FeedResponse(body=body, etag='"v1"', size=len(body)))
+        parse = MagicMock(side_effect=lambda raw: json.loads(raw)['laps'])
+
+        model = cache.get_model('url', 10, fetch, parse, from_bytes=True)
+        parse.assert_called_once_with(body)
+        self.assertFalse(cache.get_entry('url', 10, fetch, parse).has_payload())
+        self.assertIs(cache.get_model('url', 10, fetch, parse, from_bytes=True), model)
+
+        # Raw JSON is downloaded again in full, without validators; same content keeps its version and model.
+        self.assertEqual(cache.get('url', 10, fetch), {'laps': [1, 2], 'flags': []})
+        fetch.assert_called_with({})
+        self.assertEqual(cache.version('url'), 1)
+        self.assertIs(cache.get_model('url', 10, fetch, parse, from_bytes=True), model)
+        self.assertEqual(parse.call_count, 1)
+
+
+
+class TestCacheNamespace(unittest.TestCase):
+
+    def test_counts_hits_misses_evictions_and_expirations(self):
+        clock = FakeClock()
+        cache = CacheNamespace('players', maxsize=2, ttl=10, clock=clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('c')), (None, 3))
+        clock.now = 11
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['expirations'], stats['size']),
+                         (1, 1, 1, 2, 0))
+
+    def test_concurrent_loads_compute_once(self):
+        cache = CacheNamespace('players')
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(timeout=5)
+            return ['player']
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.load('all', compute))) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['player']] * 20)
+        self.assertEqual(cache.stats()['loads'], 1)
+
+    def test_cached_functions_are_dropped_by_registry_hooks(self):
+        registry = CacheRegistry()
+        calls = []
+
+        @cached('players', registry=registry)
+        def get_players(id=None):
+            calls.append(id)
+            return [id]
+
+        @cached('players-async', registry=registry)
+        async def get_players_async(id=None):
+            calls.append(id)
+            return [id]
+
+        registry.on('player', lambda player_id: get_players.cache.invalidate())
+        registry.on('player', lambda player_id: get_players_async.cache.invalidate())
+        get_players()
+        get_players()
+        asyncio.run(get_players_async('a'))
+        asyncio.run(get_players_async('a'))
+        self.assertEqual(calls, [None, 'a'])
+
+        registry.invalidate('player', 'a')
+        get_players()
+        asyncio.run(get_players_async('a'))
+        self.assertEqual(calls, [None, 'a', None, 'a'])
+        self.assertEqual(registry.stats()['players']['invalidations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import unittest
+
+from app.dependencies.drivers import DriverRegistry
+
+with open('examples/drivers.json', 'r') as file:
+    drivers_feed = json.load(file)
+
+
+class TestDriverRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = DriverRegistry(drivers_feed)
+
+    def test_typeahead_matches_linear_scan(self):
+        for query in ['', 'ch', 'Larson', 'BELL', 'zzz']:
+            expected = sorted(
+                (item['Full_Name'] for item in drivers_feed['response']
+                 if item['Crew_Chief'] and query.lower() in item['Full_Name'].lower()))
+            self.assertEqual(sorted(item['Full_Name'] for item in self.registry.typeahead(query)), expected)
+
+    def test_driver_models_are_built_once(self):
+        first = self.registry.driver('4030')
+        self.assertEqual(first.Full_Name, 'Kyle Larson')
+        self.assertIs(self.registry.driver(4030), first)
+        self.assertIsNone(self.registry.driver('not-a-driver'))
+
+    def test_typeahead_ranks_prefix_then_last_name(self):
+        names = [item['Full_Name'] for item in self.registry.typeahead('b')]
+        self.assertEqual(names[:5], ['BJ McLeod', 'Brad Keselowski', 'Bubba Wallace', 'Alex Bowman', 'Chase Briscoe'])
+        self.assertEqual(names[-1], 'Ty Gibbs')
+
+        larson = self.registry.get(4030)
+        self.assertEqual(self.registry.typeahead('l', allowed_ids={4030}), [larson])
+
+    def test_pick_options_are_cached(self):
+        first = self.registry.pick_options('Chase')
+        self.assertIs(self.registry.pick_options('chase'), first)
+        self.assertEqual([option['label'] for option in first.options[0]['options']],
+                         ['Chase Briscoe', 'Chase Elliott'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.dependencies.cache import FeedCache
+from app.dependencies.feeds import FeedClient
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    requests_served = 0
+
+    def do_GET(self):
+        FeedHandler.requests_served += 1
+        if self.path == '/missing.json':
+            self.send_response(403)
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({'laps': [], 'flags': []}).encode()
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFeedClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FeedHandler.requests_served = 0
+
+    def test_sync_fetch(self):
+        client = FeedClient(timeout=5, max_connections=2)
+        response = client.fetch_sync(f'{self.base_url}/lap-times.json')
+        self.assertEqual(response.data, {'laps': [], 'flags': []})
+        self.assertEqual(response.etag, '"v1"')
+        self.assertTrue(client.fetch_sync(f'{self.base_url}/lap-times.json', {'If-None-Match': '"v1"'}).not_modified)
+        self.assertIsNone(client.fetch_sync(f'{self.base_url}/missing.json'))
+        asyncio.run(client.close())
+
+    def test_async_fetches_are_coalesced(self):
+        client = FeedClient(timeout=5, max_connections=2)
+        cache = FeedCache()
+        url = f'{self.base_url}/lap-times.json'
+
+        async def view():
+            return await cache.aget(url, 10, lambda validators: client.fetch(url, validators))
+
+        async def run():
+            try:
+                return await asyncio.gather(*(view() for _ in range(20)))
+            finally:
+                await client.close()
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [{'laps': [], 'flags': []}] * 20)
+        self.assertEqual(FeedHandler.requests_served, 1)
+        self.assertEqual(cache.stats()['feeds'][url]['coalesced'], 19)
+
+
+if __name__ == '__main__':
+    unittest.main()
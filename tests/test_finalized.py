@@ -0,0 +1,71 @@
+import json
+import unittest
+from datetime import datetime, timedelta, UTC
+
+from app.dependencies.finalized import FINALIZED_CACHE_SECONDS, FinalizedRaceStore, SETTLE_WINDOW
+from app.dependencies.scoring import ScoringTable, score_players
+from app.models.nascar import LapTimesSummary, StagePoints, PicksItem, Player
+from tests.fixtures import FakeStateClient
+
+with open('variables/positions.json', 'r') as file:
+    results = LapTimesSummary.model_validate(json.load(file))
+with open('variables/all_drivers_stage_points.json', 'r') as file:
+    stage_points = StagePoints.model_validate(json.load(file))
+with open('variables/player_picks.json', 'r') as file:
+    player_picks = PicksItem.model_validate(json.load(file))
+
+
+class TestFinalizedRaceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeStateClient()
+        self.now = datetime(2024, 2, 25, 23, 0, tzinfo=UTC)
+        self.store = FinalizedRaceStore(self.client, 'store', clock=lambda: self.now)
+        players = {player_picks.player: Player(id=player_picks.player, hash='h', name='Player', phone_number='5555555555', type='player', admin=False)}
+        self.driver_points = score_players(ScoringTable(results, stage_points), [player_picks], players, {}, False)
+
+    def test_saved_race_round_trips_through_state_store(self):
+        self.assertIsNone(self.store.get(5386))
+        self.store.save(5386, self.driver_points, results, stage_points)
+
+        reloaded = FinalizedRaceStore(self.client, 'store').get(5386)
+        self.assertEqual(reloaded.revision, 1)
+        self.assertEqual([points.model_dump(warnings=False) for points in reloaded.driver_points],
+                         [points.model_dump(warnings=False) for points in self.driver_points])
+        self.assertEqual(reloaded.results, results)
+        self.assertEqual(reloaded.stage_points, stage_points)
+
+        self.assertEqual(self.store.save(5386, self.driver_points, results, stage_points).revision, 2)
+
+    def test_other_replicas_see_a_rescore_once_their_copy_expires(self):
+        now = [0.0]
+        replica = FinalizedRaceStore(self.client, 'store', timer=lambda: now[0])
+        self.store.save(5386, self.driver_points, results, stage_points)
+        self.assertEqual(replica.get(5386).revision, 1)
+
+        self.store.save(5386, self.driver_points, results, stage_points)
+        self.assertEqual(replica.get(5386).revision, 1)
+        now[0] = FINALIZED_CACHE_SECONDS + 1
+        self.assertEqual(replica.get(5386).revision, 2)
+
+    def test_cached_lookups_skip_the_state_store(self):
+        self.store.get(5386)
+        self.store.get(5386)
+        self.assertEqual(self.client.get_state.call_count, 1)
+
+        self.store.save(5386, self.driver_points, results, stage_points)
+        reads = self.client.get_state.call_count
+        self.store.get(5386)
+        self.assertEqual(self.client.get_state.call_count, reads)
+
+    def test_settles_after_checkered_flag_window(self):
+        started = self.now - timedelta(hours=4)
+        self.assertFalse(self.store.is_settled(5386, LapTimesSummary(laps=[], flags=[]), started))
+        self.assertFalse(self.store.is_settled(5386, results, started))
+        self.now += SETTLE_WINDOW
+        self.assertTrue(self.store.is_settled(5386, results, started))
+        self.assertTrue(self.store.is_settled(5000, results, started - timedelta(days=7)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import threading
+import unittest
+from datetime import datetime, timedelta, UTC
+from unittest.mock import patch, MagicMock
+
+from app.dependencies import live
+from app.models.nascar import LapTimes, Flag, DriverPoints, Position
+
+
+class TestLivePoller(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(live, 'live_board', live.LiveBoard())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('app.dependencies.live.feed_cache')
+    @patch('app.dependencies.live.get_driver_points')
+    @patch('app.dependencies.live.get_driver_stage_points')
+    @patch('app.dependencies.live.get_driver_position')
+    def test_refresh_recomputes_only_on_feed_change(self, mock_position, mock_stage_points, mock_points, mock_feed_cache):
+        mock_position.return_value = LapTimes(laps=[], flags=[Flag(LapsCompleted=1, FlagState=1)])
+        mock_points.return_value = [DriverPoints(name='player1')]
+        mock_feed_cache.version.side_effect = [1, 1, 1, 1, 2, 1]
+
+        first = live.refresh_race(5386)
+        second = live.refresh_race(5386)
+        third = live.refresh_race(5386)
+
+        self.assertIs(first, second)
+        self.assertEqual(third.version, 2)
+        self.assertEqual(mock_points.call_count, 2)
+        self.assertIs(live.live_board.get(5386), third)
+
+    @patch('app.dependencies.live.feed_cache')
+    @patch('app.dependencies.live.get_driver_points')
+    @patch('app.dependencies.live.get_driver_stage_points')
+    @patch('app.dependencies.live.get_driver_position')
+    def test_snapshots_go_stale_once_nothing_checks_them(self, mock_position, mock_stage_points, mock_points, mock_feed_cache):
+        mock_position.return_value = LapTimes(laps=[], flags=[Flag(LapsCompleted=1, FlagState=1)])
+        mock_points.return_value = [DriverPoints(name='player1')]
+        mock_feed_cache.version.return_value = 1
+
+        with patch('app.dependencies.live.time.time', return_value=1000):
+            snapshot = live.refresh_race(5386)
+        with patch('app.dependencies.live.time.time', return_value=1000 + live.LIVE_SNAPSHOT_MAX_AGE_SECONDS + 1):
+            self.assertIsNone(live.live_board.fresh(5386))
+            # An unchanged feed keeps the same snapshot current.
+            self.assertIs(live.refresh_race(5386), snapshot)
+            self.assertIs(live.live_board.fresh(5386), snapshot)
+        self.assertEqual(mock_points.call_count, 1)
+
+    @patch('app.dependencies.live.get_driver_points')
+    @patch('app.dependencies.live.get_driver_position')
+    def test_refresh_skips_races_that_have_not_started(self, mock_position, mock_points):
+        mock_position.return_value = LapTimes(laps=[], flags=[])
+
+        self.assertIsNone(live.refresh_race(5386))
+        mock_points.assert_not_called()
+
+    @patch('app.dependencies.live.get_full_race_schedule_model')
+    def test_live_race_ids(self, mock_schedule):
+        now = datetime(2024, 3, 3, 20, 0, tzinfo=UTC)
+        mock_schedule.return_value = [
+            MagicMock(race_id=1, start_time_utc=now - timedelta(days=7)),
+            MagicMock(race_id=2, start_time_utc=now - timedelta(hours=1)),
+            MagicMock(race_id=3, start_time_utc=now + timedelta(days=1)),
+        ]
+
+        self.assertEqual(live.live_race_ids(now), [2])
+
+    def test_snapshot_events_send_deltas_to_caught_up_viewers(self):
+        results = LapTimes(laps=[Position(Number='5', FullName='Kyle Larson', Manufacturer='Chv', RunningPos=1, NASCARDriverID=4030, Laps=[])], flags=[])
+        # Two players share a display name.
+        first = live.live_board.publish(5386, results, [DriverPoints(player='player-a', name='Sam'), DriverPoints(player='player-b', name='Sam')], (1, 1))
+        second = live.live_board.publish(5386, results, [DriverPoints(player='player-b', name='Sam', stage_points=3), DriverPoints(player='player-a', name='Sam')], (2, 1))
+
+        self.assertEqual([event.split('\n')[0] for event in live.snapshot_events(None, first)],
+                         ['event: leaderboard', 'event: running-order'])
+        events = live.snapshot_events(first, second)
+        self.assertEqual(len(events), 1)
+        delta = json.loads(events[0].split('\n')[1][len('data: '):])
+        self.assertEqual(delta['order'], ['player-b', 'player-a'])
+        self.assertEqual([row['player'] for row in delta['updated']], ['player-b'])
+        self.assertEqual(delta['removed'], [])
+
+    @patch('app.dependencies.live.refresh_race')
+    def test_stream_pushes_published_snapshots(self, mock_refresh):
+        results = LapTimes(laps=[], flags=[])
+
+        async def run():
+            stream = live.race_event_stream(5386, keepalive_seconds=5)
+            pending = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0.05)
+            threading.Thread(target=live.live_board.publish, args=(5386, results, [DriverPoints(name='a')], (1, 1))).start()
+            event = await asyncio.wait_for(pending, 5)
+            await stream.aclose()
+            return event
+
+        with patch.object(live, 'LIVE_POLLER_ENABLED', False):
+            event = asyncio.run(run())
+        self.assertTrue(event.startswith('event: leaderboard\n'))
+        self.assertEqual(live.watched_races, {})
+        # The last stream closed and no poller refreshes the race any more.
+        self.assertIsNone(live.live_board.get(5386))
+
+
+if __name__ == '__main__':
+    unittest.main()
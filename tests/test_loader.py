@@ -0,0 +1,59 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from app.dependencies.loader import DataLoader, LastGood
+
+
+class TestDataLoader(unittest.TestCase):
+
+    def test_each_call_runs_once_per_loader(self):
+        fetch = MagicMock(side_effect=lambda race_id: {'race': race_id})
+        loader = DataLoader()
+        loader.prefetch((fetch, 1))
+        first = loader.get(fetch, 1)
+        self.assertIs(loader.get(fetch, 1), first)
+        loader.get(fetch, 2)
+        self.assertEqual(fetch.call_count, 2)
+
+        DataLoader().get(fetch, 1)
+        self.assertEqual(fetch.call_count, 3)
+
+    def test_prefetches_run_concurrently(self):
+        def slow(value):
+            time.sleep(0.2)
+            return value
+
+        loader = DataLoader()
+        start = time.perf_counter()
+        loader.prefetch((slow, 'schedule'), (slow, 'lap-times'), (slow, 'stage-points'))
+        self.assertEqual([loader.get(slow, 'schedule'), loader.get(slow, 'lap-times'), loader.get(slow, 'stage-points')],
+                         ['schedule', 'lap-times', 'stage-points'])
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+
+class TestLastGood(unittest.TestCase):
+
+    def test_slow_or_failing_source_falls_back_to_last_value(self):
+        async def source(value, delay=0):
+            await asyncio.sleep(delay)
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        async def run():
+            last_good = LastGood()
+            self.assertEqual(await last_good.fetch('lap-times', source('first'), timeout=1), ('first', True))
+            self.assertEqual(await last_good.fetch('lap-times', source('late', delay=0.5), timeout=0.05), ('first', False))
+            await asyncio.sleep(0.6)
+            self.assertEqual(await last_good.fetch('lap-times', source(ValueError('down')), timeout=1), ('late', False))
+            with self.assertRaises(ValueError):
+                await last_good.fetch('stage-points', source(ValueError('down')), timeout=1)
+            self.assertEqual(await last_good.fetch('stage-points', source('slow', delay=0.1), timeout=0.01), ('slow', True))
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,48 +1,147 @@
+import asyncio
+import json
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from datetime import datetime
 from app.dependencies.nascar import (
-    get_driver_points, calculate_points, is_playoff_race, has_race_started,
-    assign_playoff_points, calculate_position_points, calculate_stage_points
+    get_driver_points, get_driver_points_async, get_player_async, calculate_points, is_playoff_race, has_race_started,
+    assign_playoff_points, calculate_position_points, calculate_stage_points,
+    get_players_by_id, player_cache, previous_picks_indexes, race_status
 )
-from app.models.nascar import LapTimes, PicksItem, PlayerPicks, StagePoints, DriverPoints, PickPoints, Driver, Player, StagePointsItem, Result
+from app.dependencies.recipients import NotificationRecipients
+from app.dependencies.schedule import ScheduleIndex
+from app.models.nascar import LapTimes, LapTimesSummary, PicksItem, PlayerPicks, StagePoints, DriverPoints, PickPoints, Driver, Player, StagePointsItem, Result
+from tests.fixtures import AsyncFakeStateClient, FakeStateClient
+
+
+def schedule_item(race_id, event_name, race_name, start_time_utc):
+    return {
+        'race_id': race_id, 'event_name': event_name, 'race_name': race_name, 'start_time': '', 'end_time': '',
+        'track_id': 1, 'track_name': 'Track', 'series_id': 1, 'run_type': 3,
+        'start_time_utc': start_time_utc, 'end_time_utc': start_time_utc,
+    }
 
 
 class TestNascarFunctions(unittest.TestCase):
 
-    @patch('app.dependencies.nascar.get_player')
-    @patch('app.dependencies.nascar.get_driver_picks')
-    @patch('app.dependencies.nascar.get_full_race_schedule_model')
+    @patch('app.dependencies.nascar.finalized_races', MagicMock(get=MagicMock(return_value=None), is_settled=MagicMock(return_value=False)))
+    @patch('app.dependencies.nascar.get_players_by_id')
+    @patch('app.dependencies.nascar.get_races_driver_picks')
+    @patch('app.dependencies.nascar.get_schedule_index')
     @patch('app.dependencies.nascar.get_weekend_feed')
     @patch('app.dependencies.nascar.get_driver_position')
     @patch('app.dependencies.nascar.get_driver_stage_points')
-    def test_get_driver_points(self, mock_stage_points, mock_position, mock_weekend_feed, mock_schedule, mock_picks, mock_get_player):
+    def test_get_driver_points(self, mock_stage_points, mock_position, mock_weekend_feed, mock_schedule, mock_picks, mock_get_players):
+        self.addCleanup(previous_picks_indexes.clear)
+        self.addCleanup(race_status.reset)
         # Mock data
         mock_player = MagicMock(spec=Player)
         mock_player.name = 'player1'
-        mock_get_player.return_value = mock_player
+        mock_get_players.return_value = {'player1': mock_player}
 
         mock_driver = MagicMock(spec=Driver)
         mock_driver.Nascar_Driver_ID = 1
         mock_driver.Full_Name = 'Driver 1'
 
-        mock_picks.return_value = [
-            PicksItem(player='player1', picks=[mock_driver], race='Race 1', type='RaceType')
-        ]
-        mock_schedule.side_effect = lambda id=None: MagicMock(race_id=id, event_name='Race', race_name='DAYTONA 500') if id else [
-            MagicMock(race_id='1', event_name='Race', race_name='DAYTONA 500'),
-            MagicMock(race_id='2', event_name='Race', race_name='Race 2')
-        ]
+        mock_picks.return_value = {
+            2: [PicksItem(player='player1', picks=[mock_driver], race='Race 2', type='RaceType')],
+            1: [PicksItem(player='player1', picks=[mock_driver], race='Race 1', type='RaceType')],
+        }
+        mock_schedule.return_value = ScheduleIndex([
+            schedule_item(1, 'Race', 'DAYTONA 500', '2024-02-18T19:30:00'),
+            schedule_item(2, 'Race', 'Race 2', '2024-02-25T20:00:00'),
+        ])
         mock_weekend_feed.return_value = MagicMock(weekend_race=[MagicMock(playoff_round=True)])
         mock_position.return_value = MagicMock(flags=[MagicMock(FlagState=1)])
         mock_stage_points.return_value = StagePoints(root=[])
 
         # Call function
-        result = get_driver_points('1')
+        result = get_driver_points('2')
 
         # Assertions
         self.assertIsInstance(result, list)
         self.assertGreaterEqual(len(result), 0)
+        mock_picks.assert_called_once_with((2, 1))
+        self.assertTrue(result[0].pick_1_repeated_pick)
+
+        # The previous race's index is cached now, so whether it started isn't asked again.
+        with patch('app.dependencies.nascar.race_started') as mock_race_started:
+            self.assertTrue(get_driver_points('2')[0].pick_1_repeated_pick)
+        mock_race_started.assert_not_called()
+
+    @patch('app.dependencies.nascar.finalized_races', MagicMock(aget=AsyncMock(return_value=None), get=MagicMock(return_value=None), is_settled=MagicMock(return_value=False)))
+    def test_get_driver_points_async_matches_sync(self):
+        self.addCleanup(previous_picks_indexes.clear)
+        self.addCleanup(race_status.reset)
+        with open('variables/positions.json', 'r') as file:
+            results = LapTimesSummary.model_validate(json.load(file))
+        with open('variables/all_drivers_stage_points.json', 'r') as file:
+            stage_points = StagePoints.model_validate(json.load(file))
+        with open('variables/previous_race_picks.json', 'r') as file:
+            previous_race_picks = PlayerPicks.model_validate(json.load(file))
+        with open('variables/player_picks.json', 'r') as file:
+            race_picks = PlayerPicks(root=[PicksItem.model_validate(json.load(file))])
+        picks = {5386: race_picks, 5408: previous_race_picks}
+        players = {item.player: Player(id=item.player, hash=item.player, name=item.player, phone_number='5555555555', type='player', admin=False)
+                   for item in race_picks.root + previous_race_picks.root}
+        schedule = ScheduleIndex([
+            schedule_item(5400, 'Race', 'DAYTONA 500', '2024-02-18T19:30:00'),
+            schedule_item(5408, 'Race', 'Race 2', '2024-02-25T20:00:00'),
+            schedule_item(5386, 'Race', 'Race 3', '2024-03-03T20:00:00'),
+        ])
+        weekend_feed = MagicMock(weekend_race=[MagicMock(playoff_round=False)])
+
+        sources = {
+            'get_schedule_index': schedule, 'get_weekend_feed': weekend_feed, 'get_driver_position': results,
+            'get_driver_stage_points': stage_points, 'race_started': True,
+        }
+        patches = [patch(f'app.dependencies.nascar.{name}', MagicMock(return_value=value)) for name, value in sources.items()]
+        patches += [patch(f'app.dependencies.nascar.{name}_async', AsyncMock(return_value=value)) for name, value in sources.items()]
+        patches += [
+            patch('app.dependencies.nascar.get_races_driver_picks', MagicMock(side_effect=lambda ids: {i: picks[i] for i in ids})),
+            patch('app.dependencies.nascar.get_races_driver_picks_async', AsyncMock(side_effect=lambda ids: {i: picks[i] for i in ids})),
+            patch('app.dependencies.nascar.get_players_by_id', MagicMock(side_effect=lambda ids: {i: players[i] for i in ids})),
+            patch('app.dependencies.nascar.get_players_by_id_async', AsyncMock(side_effect=lambda ids: {i: players[i] for i in ids})),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        expected = get_driver_points(5386)
+        previous_picks_indexes.clear()
+        actual = asyncio.run(get_driver_points_async(5386))
+        self.assertEqual([points.model_dump(warnings=False) for points in actual],
+                         [points.model_dump(warnings=False) for points in expected])
+        self.assertTrue(actual[0].pick_1_repeated_pick or actual[0].pick_2_repeated_pick or actual[0].pick_3_repeated_pick)
+
+    @patch('app.dependencies.nascar.get_async_dapr_client')
+    def test_get_player_async_reads_through_the_cache(self, mock_client):
+        player_cache.invalidate()
+        self.addCleanup(player_cache.invalidate)
+        record = MagicMock()
+        record.json.return_value = {'id': 'player-a', 'hash': 'hash-a', 'name': 'a',
+                                    'phone_number': '5555555555', 'type': 'player', 'admin': False}
+        mock_client.return_value.query_state = AsyncMock(return_value=MagicMock(results=[record]))
+
+        self.assertEqual(asyncio.run(get_player_async(player_hash='hash-a')).name, 'a')
+        self.assertEqual(asyncio.run(get_player_async(player_id='player-a')).name, 'a')
+        mock_client.return_value.query_state.assert_awaited_once()
+
+    @patch('app.dependencies.nascar.get_async_dapr_client')
+    def test_get_player_async_skips_the_recipient_record_sharing_its_hash(self, mock_client):
+        player_cache.invalidate()
+        self.addCleanup(player_cache.invalidate)
+        state = FakeStateClient()
+        payload = {'id': 'player-a', 'hash': 'hash-a', 'name': 'a', 'phone_number': '5555555555',
+                   'type': 'player', 'admin': False, 'text_notifications': True}
+        client = AsyncFakeStateClient(state)
+        # The recipient record is stored first, so an unfiltered query would return it.
+        asyncio.run(NotificationRecipients('statestore').aupdate(payload, client))
+        state.save_state('statestore', 'player-a', json.dumps(payload))
+        mock_client.return_value = client
+
+        player = asyncio.run(get_player_async(player_hash='hash-a'))
+        self.assertEqual((player.id, player.admin), ('player-a', False))
 
     def test_calculate_position_points(self):
         # Mock data
@@ -74,6 +173,39 @@ class TestNascarFunctions(unittest.TestCase):
         # Assertions
         self.assertEqual(points, (10, 1))
 
+    @patch('app.dependencies.nascar.dapr_client')
+    def test_get_players_by_id_uses_one_bulk_fetch(self, mock_dapr):
+        player_cache.invalidate()
+        items = []
+        for name in ['a', 'b']:
+            item = MagicMock(key=f'player-{name}', data=b'{}')
+            item.json.return_value = {'id': f'player-{name}', 'hash': f'hash-{name}', 'name': name,
+                                      'phone_number': '5555555555', 'type': 'player', 'admin': False}
+            items.append(item)
+        mock_dapr.get_bulk_state.return_value = MagicMock(items=items)
+
+        players = get_players_by_id(['player-a', 'player-b', 'player-a'])
+        self.assertEqual({key: player.name for key, player in players.items()}, {'player-a': 'a', 'player-b': 'b'})
+        self.assertEqual(player_cache.by_hash('hash-b').name, 'b')
+        get_players_by_id(['player-b'])
+        mock_dapr.get_bulk_state.assert_called_once()
+        mock_dapr.query_state.assert_not_called()
+
+        player_cache.invalidate('player-b')
+        get_players_by_id(['player-b'])
+        self.assertEqual(mock_dapr.get_bulk_state.call_count, 2)
+
+    def test_lap_times_summary_matches_full_model(self):
+        with open('variables/positions.json', 'r') as file:
+            positions = json.load(file)
+
+        full = LapTimes.model_validate(positions)
+        summary = LapTimesSummary.model_validate(positions)
+
+        self.assertEqual([p.NASCARDriverID for p in summary.laps], [p.NASCARDriverID for p in full.laps])
+        self.assertEqual(summary.flags, full.flags)
+        self.assertEqual(calculate_position_points(summary, MagicMock(Nascar_Driver_ID=4023)), 40)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import unittest
+
+from app.dependencies.drivers import DriverRegistry
+from app.dependencies.picks import READY_KEY, PicksRecord, PicksStore
+from app.dependencies.scoring import ScoringTable, previous_picks_index, score_players
+from app.models.nascar import LapTimesSummary, StagePoints, PlayerPicks, Driver, Player
+from tests.fixtures import AsyncFakeStateClient, FakeStateClient
+
+with open('examples/drivers.json', 'r') as file:
+    drivers_feed = json.load(file)
+with open('variables/positions.json', 'r') as file:
+    results = LapTimesSummary.model_validate(json.load(file))
+with open('variables/all_drivers_stage_points.json', 'r') as file:
+    stage_points = StagePoints.model_validate(json.load(file))
+with open('variables/previous_race_picks.json', 'r') as file:
+    previous_race_picks = PlayerPicks.model_validate(json.load(file))
+
+
+def stored(item):
+    """A picks record the way picks_record saves it."""
+    return {'player': item.player, 'race': item.race, 'type': 'picks', 'pick_time': '2024-04-10T12:00:00',
+            'picks': [str(pick.Nascar_Driver_ID) for pick in item.picks]}
+
+
+class TestPicksRecord(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = DriverRegistry(drivers_feed)
+        self.records = [PicksRecord.from_json(stored(item), self.registry) for item in previous_race_picks]
+
+    def test_records_share_one_pick_per_driver(self):
+        picks = [pick for record in self.records for pick in record.picks]
+        by_id = {}
+        for pick in picks:
+            self.assertIs(by_id.setdefault(pick.Nascar_Driver_ID, pick), pick)
+        self.assertEqual(self.registry.pick('4030').Full_Name, 'Kyle Larson')
+        self.assertEqual(self.registry.pick('not-a-driver').Full_Name, '')
+
+    def test_scores_match_full_driver_models(self):
+        players = {item.player: Player(id=item.player, hash=item.player, name=item.player, phone_number='5555555555',
+                                       type='player', admin=False) for item in previous_race_picks}
+        table = ScoringTable(results, stage_points)
+        index = previous_picks_index(previous_race_picks)
+
+        hydrated = [record.hydrate(self.registry) for record in self.records]
+        self.assertIsInstance(hydrated[0].picks[0], Driver)
+        self.assertEqual(previous_picks_index(self.records), index)
+        self.assertEqual([points.model_dump(warnings=False) for points in score_players(table, self.records, players, index, 0)],
+                         [points.model_dump(warnings=False) for points in score_players(table, hydrated, players, index, 0)])
+
+
+class TestPicksStore(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeStateClient()
+        self.async_client = AsyncFakeStateClient(self.client)
+        self.store = PicksStore(self.client, 'statestore')
+
+    def record(self, player_id, race_id):
+        return {'player': player_id, 'race': str(race_id), 'type': 'picks', 'picks': ['4030']}
+
+    def save(self, store, player_id, race_id):
+        asyncio.run(store.asave_many({PicksStore.key(player_id, race_id): self.record(player_id, race_id)}, self.async_client))
+
+    def test_races_read_manifests_instead_of_querying(self):
+        # Picked before manifests existed.
+        self.client.save_state('statestore', PicksStore.key('a', 5386), json.dumps(self.record('a', 5386)))
+        self.client.save_state('statestore', PicksStore.key('a', 5408), json.dumps(self.record('a', 5408)))
+        self.save(self.store, 'b', 5386)
+
+        self.assertEqual(self.client.query_state.call_count, 1)
+        self.assertEqual(sorted(item.json()['player'] for item in self.store.races([5386])), ['a', 'b'])
+        self.assertEqual([item.json()['race'] for item in self.store.races([5386, 5408])], ['5386', '5386', '5408'])
+        self.assertEqual([item.json()['player'] for item in self.store.player_race('b', 5386)], ['b'])
+
+        # Reads don't migrate a race; it keeps being queried until the backfill.
+        self.store.races([5386, 5408])
+        self.assertEqual(self.client.query_state.call_count, 3)
+        self.assertNotIn(PicksStore.manifest_key(5408), self.client.values)
+        self.assertEqual(self.store.races([9999]), [])
+        self.assertNotIn(PicksStore.manifest_key(9999), self.client.values)
+
+    def test_backfill_writes_manifests_once_and_stops_the_queries(self):
+        self.save(self.store, 'b', 5386)
+        for player_id, race_id in [('a', 5386), ('a', 5408)]:
+            self.client.save_state('statestore', PicksStore.key(player_id, race_id), json.dumps(self.record(player_id, race_id)))
+
+        self.assertTrue(asyncio.run(self.store.abackfill(self.async_client)))
+        self.assertFalse(asyncio.run(self.store.abackfill(self.async_client)))
+        self.assertEqual(json.loads(self.client.values[PicksStore.manifest_key(5386)])['keys'], ['picks-b-5386', 'picks-a-5386'])
+        self.assertEqual(json.loads(self.client.values[PicksStore.manifest_key(5408)])['keys'], ['picks-a-5408'])
+
+        # Another replica sees the marker on its first read.
+        replica = PicksStore(self.client, 'statestore')
+        self.client.query_state.reset_mock()
+        self.assertEqual([item.json()['race'] for item in replica.races([5386, 5408])], ['5386', '5386', '5408'])
+        self.assertEqual(replica.races([9999]), [])
+        self.save(replica, 'c', 6000)
+        self.client.query_state.assert_not_called()
+        self.assertEqual(json.loads(self.client.values[PicksStore.manifest_key(6000)])['keys'], ['picks-c-6000'])
+        self.assertNotIn(READY_KEY, replica._manifest_read([6000]))
+
+    def test_manifest_update_retries_when_another_writer_got_there_first(self):
+        self.save(self.store, 'a', 5386)
+        save_state = self.client.save_state
+
+        def racing_save(store_name, key, value, etag=None, options=None, state_metadata=None):
+            # Another replica adds its pick between our read and write.
+            self.client.save_state = save_state
+            save_state(store_name, PicksStore.manifest_key(5386),
+                       json.dumps({'type': 'race-picks', 'race': '5386', 'keys': ['picks-a-5386', 'picks-c-5386']}))
+            save_state(store_name, key, value, etag, options, state_metadata)
+
+        self.client.save_state = racing_save
+        self.save(self.store, 'b', 5386)
+
+        manifest = json.loads(self.client.values[PicksStore.manifest_key(5386)])
+        self.assertEqual(manifest['keys'], ['picks-a-5386', 'picks-c-5386', 'picks-b-5386'])
+
+
+if __name__ == '__main__':
+    unittest.main()
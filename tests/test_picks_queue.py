@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+from app.dependencies.picks_queue import PicksWriteQueue
+
+
+def payload(player_id, picks):
+    return {'player': player_id, 'race': '5386', 'type': 'picks', 'picks': picks, 'pick_time': '2024-04-10T12:00:00'}
+
+
+class TestPicksWriteQueue(unittest.TestCase):
+
+    def test_concurrent_submissions_share_one_bulk_write(self):
+        store = AsyncMock()
+        queue = PicksWriteQueue(store, window=0.05)
+
+        async def submit_all():
+            receipts = await asyncio.gather(
+                queue.submit('picks-a-5386', payload('a', ['1']), 'client'),
+                queue.submit('picks-b-5386', payload('b', ['2']), 'client'),
+                queue.submit('picks-a-5386', payload('a', ['3']), 'client'),
+            )
+            await queue.close()
+            return receipts
+
+        receipts = asyncio.run(submit_all())
+
+        store.asave_many.assert_awaited_once_with(
+            {'picks-a-5386': payload('a', ['3']), 'picks-b-5386': payload('b', ['2'])}, 'client')
+        self.assertEqual([receipt.key for receipt in receipts], ['picks-a-5386', 'picks-b-5386', 'picks-a-5386'])
+        self.assertEqual(receipts[0].batch_size, 2)
+
+    def test_failed_writes_are_retried_then_reported(self):
+        store = AsyncMock()
+        store.asave_many.side_effect = [ConnectionError('down'), None]
+        queue = PicksWriteQueue(store, window=0, attempts=2)
+        receipt = asyncio.run(queue.submit('picks-a-5386', payload('a', ['1']), 'client'))
+        self.assertEqual(receipt.player, 'a')
+        self.assertEqual(store.asave_many.await_count, 2)
+
+        store.asave_many.side_effect = ConnectionError('down')
+        with self.assertRaises(ConnectionError):
+            asyncio.run(queue.submit('picks-a-5386', payload('a', ['1']), 'client'))
+
+
+if __name__ == '__main__':
+    unittest.main()
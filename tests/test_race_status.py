@@ -0,0 +1,38 @@
+import unittest
+from datetime import datetime, timedelta, UTC
+from unittest.mock import MagicMock
+
+from app.dependencies.race_status import RaceStatus
+from app.models.nascar import LapTimesSummary, Flag
+
+START = datetime(2024, 3, 3, 20, 0, tzinfo=UTC)
+
+
+class TestRaceStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.now = START
+        self.get_results = MagicMock(return_value=LapTimesSummary(laps=[], flags=[Flag(LapsCompleted=0, FlagState=8)]))
+        self.status = RaceStatus(
+            get_race=lambda race_id: MagicMock(start_time_utc=START),
+            get_results=self.get_results,
+            clock=lambda: self.now,
+        )
+
+    def test_well_before_start_does_not_fetch_feed(self):
+        self.now = START - timedelta(days=2)
+
+        self.assertFalse(self.status.started(5386))
+        self.get_results.assert_not_called()
+
+    def test_green_flag_is_sticky(self):
+        self.assertFalse(self.status.started(5386))
+        self.get_results.return_value = LapTimesSummary(laps=[], flags=[Flag(LapsCompleted=1, FlagState=1)])
+        self.assertTrue(self.status.started('5386'))
+        self.assertTrue(self.status.started(5386))
+
+        self.assertEqual(self.get_results.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.dependencies.recipients import READY_KEY, NotificationRecipients
+from app.models.nascar import Player
+from tests.fixtures import AsyncFakeStateClient, FakeStateClient
+
+
+def player(player_id, text_notifications):
+    return {'id': player_id, 'name': player_id, 'phone_number': '5555555555', 'hash': f'hash-{player_id}',
+            'type': 'player', 'text_notifications': text_notifications, 'admin': False}
+
+
+class TestNotificationRecipients(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeStateClient()
+        self.recipients = NotificationRecipients('statestore')
+
+    def test_publishing_players_keeps_only_opted_in_recipients(self):
+        client = AsyncFakeStateClient(self.client)
+        asyncio.run(self.recipients.aupdate(player('player-a', True), client))
+        asyncio.run(self.recipients.aupdate(player('player-b', False), client))
+        self.assertEqual(json.loads(self.client.values['recipient-player-a']),
+                         {'id': 'player-a', 'name': 'player-a', 'phone_number': '5555555555', 'hash': 'hash-player-a',
+                          'type': 'recipient'})
+        self.assertNotIn('recipient-player-b', self.client.values)
+
+        asyncio.run(self.recipients.aupdate(player('player-a', False), client))
+        asyncio.run(self.recipients.aupdate(player('player-b', True), client))
+        asyncio.run(self.recipients.aremove('player-b', client))
+        self.assertEqual([key for key in self.client.values if key.startswith('recipient-')], [])
+
+    def test_backfill_runs_once(self):
+        client = AsyncMock()
+        client.get_state.return_value = MagicMock(data=b'')
+        list_players = AsyncMock(return_value=[Player(**player('player-a', True)), Player(**player('player-b', None))])
+
+        self.assertTrue(asyncio.run(self.recipients.abackfill(list_players, client)))
+        saved = [call.args[1] for call in client.save_state.await_args_list]
+        self.assertEqual(saved, ['recipient-player-a', READY_KEY])
+        client.delete_state.assert_awaited_once_with(store_name='statestore', key='recipient-player-b')
+
+        client.get_state.return_value = MagicMock(data=b'{}')
+        list_players.reset_mock()
+        self.assertFalse(asyncio.run(self.recipients.abackfill(list_players, client)))
+        list_players.assert_not_awaited()
+
+
+if __name__ == '__main__':
+    unittest.main()
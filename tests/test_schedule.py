@@ -0,0 +1,91 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app.dependencies.schedule import ScheduleIndex
+from app.models.nascar import ScheduleItem
+
+now = datetime(2024, 4, 10, 12, 0)
+
+
+def schedule_item(race_id, event_name, race_name, start):
+    return {
+        'race_id': race_id, 'event_name': event_name, 'race_name': race_name,
+        'start_time': '', 'end_time': '', 'track_id': 1, 'track_name': 'Track', 'series_id': 1, 'run_type': 3,
+        'start_time_utc': start.strftime("%Y-%m-%dT%H:%M:%S"),
+        'end_time_utc': (start + timedelta(hours=4)).strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def season():
+    start = datetime(2024, 2, 4, 20, 0)
+    items = [
+        schedule_item(5400, 'Race', 'Busch Light Clash', start),
+        schedule_item(5401, 'Duel 1', 'Bluegreen Vacations Duel 1', start + timedelta(days=11)),
+        schedule_item(5402, 'Duel 2', 'Bluegreen Vacations Duel 2', start + timedelta(days=11, hours=2)),
+        schedule_item(5403, 'Race', 'DAYTONA 500', start + timedelta(days=14)),
+    ]
+    for week in range(3, 30):
+        race_start = start + timedelta(days=7 * week)
+        items.append(schedule_item(5400 + week + 10, 'Practice', 'Practice', race_start - timedelta(days=1)))
+        items.append(schedule_item(5400 + week + 10, 'Race', f'Race {week}', race_start))
+    items.append(schedule_item(5500, 'Race (ALL-STAR)', 'All-Star Race', start + timedelta(days=7 * 15 + 3)))
+    # The feed isn't sorted.
+    return list(reversed(items))
+
+
+def legacy_schedule(full_schedule, id=None, one_week_in_future_only=None, text_notifications_only=None):
+    """The sort-and-filter get_full_race_schedule_model used to run on every call."""
+    current_date = now
+    full_schedule_sorted = sorted(full_schedule, key=lambda x: x['start_time_utc'])
+    first_race = next((item for item in full_schedule_sorted if item['event_name'] == 'Race' or item['event_name'] == 'Race (ALL-STAR)' or 'Duel' in item['race_name']), None)
+    filtered_schedule = {}
+    if first_race and not text_notifications_only:
+        filtered_schedule[first_race['race_id']] = ScheduleItem(**first_race)
+    for item in full_schedule_sorted:
+        if item['race_id'] == id and (item['event_name'] == 'Race' or item['event_name'] == 'Race (ALL-STAR)' or 'Duel' in item['event_name']):
+            return ScheduleItem(**item)
+        if (item['race_id'] != first_race['race_id'] and
+            (item['event_name'] == 'Race' or item['event_name'] == 'Race (ALL-STAR)' or 'Duel' in item['event_name']) and
+            (not one_week_in_future_only or
+             (datetime.strptime(item["start_time_utc"], "%Y-%m-%dT%H:%M:%S") < current_date + timedelta(days=5) and
+              (not text_notifications_only or datetime.strptime(item["start_time_utc"], "%Y-%m-%dT%H:%M:%S") >= current_date)))):
+            filtered_schedule[item['race_id']] = ScheduleItem(**item)
+    return list(filtered_schedule.values())
+
+
+class TestScheduleIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.full_schedule = season()
+        self.index = ScheduleIndex(self.full_schedule)
+
+    def test_select_matches_legacy_filtering(self):
+        for one_week in [None, True]:
+            for text_only in [None, True]:
+                self.assertEqual(self.index.select(None, one_week, text_only, now=now),
+                                 legacy_schedule(self.full_schedule, None, one_week, text_only))
+        self.assertEqual(self.index.select(5420, now=now), legacy_schedule(self.full_schedule, 5420))
+        self.assertEqual([race.race_id for race in self.index.select(one_week_in_future_only=True, text_notifications_only=True, now=now)],
+                         [5420])
+
+    def test_previous_points_race_matches_schedule_walk(self):
+        full_schedule = legacy_schedule(self.full_schedule)
+        for race in full_schedule:
+            expected = None
+            if race.event_name == 'Race':
+                points_race_begin = False
+                for race_index in range(len(full_schedule)):
+                    if full_schedule[race_index].race_name == "DAYTONA 500":
+                        points_race_begin = True
+                        continue
+                    if full_schedule[race_index].race_id == race.race_id and race_index > 0 and points_race_begin:
+                        expected = full_schedule[race_index - 1]
+            self.assertEqual(self.index.previous_points_race(race.race_id), expected)
+
+        self.assertEqual(self.index.previous_points_race(5413).race_name, 'DAYTONA 500')
+        self.assertEqual(self.index.points_races[0].race_name, 'DAYTONA 500')
+        self.assertNotIn(5500, [race.race_id for race in self.index.points_races])
+
+
+if __name__ == '__main__':
+    unittest.main()
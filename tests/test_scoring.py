@@ -0,0 +1,66 @@
+import json
+import random
+import unittest
+from unittest.mock import MagicMock
+
+from app.dependencies.nascar import calculate_points, calculate_position_points, calculate_stage_points
+from app.dependencies.scoring import ScoringTable, previous_picks_index, score_players
+from app.models.nascar import LapTimesSummary, StagePoints, PlayerPicks, PicksItem, Player
+
+with open('variables/positions.json', 'r') as file:
+    results = LapTimesSummary.model_validate(json.load(file))
+with open('variables/all_drivers_stage_points.json', 'r') as file:
+    stage_points = StagePoints.model_validate(json.load(file))
+with open('variables/previous_race_picks.json', 'r') as file:
+    previous_race_picks = PlayerPicks.model_validate(json.load(file))
+with open('variables/player_picks.json', 'r') as file:
+    player_picks = PicksItem.model_validate(json.load(file))
+
+
+def player(player_id):
+    return Player(id=player_id, hash=player_id, name=player_id, phone_number='5555555555', type='player', admin=False)
+
+
+class TestScoringTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = ScoringTable(results, stage_points)
+
+    def test_lookups_match_scan_functions(self):
+        driver_ids = {position.NASCARDriverID for position in results.laps} | {0}
+        for stage in stage_points:
+            driver_ids |= {result.driver_id for result in stage.results}
+
+        for driver_id in driver_ids:
+            pick = MagicMock(Nascar_Driver_ID=driver_id)
+            self.assertEqual(self.table.position(driver_id), calculate_position_points(results, pick))
+            self.assertEqual(self.table.stage(driver_id), calculate_stage_points(stage_points, pick))
+
+    def test_score_players_matches_calculate_points(self):
+        drivers = {pick.Nascar_Driver_ID: pick for item in previous_race_picks for pick in item.picks}
+        random.seed(7)
+        race_picks = [player_picks] + [
+            PicksItem(type='picks', race='5386', player=item.player, picks=random.sample(list(drivers.values()), 3))
+            for item in previous_race_picks
+        ]
+        players = {item.player: player(item.player) for item in race_picks}
+
+        expected = [
+            calculate_points(results, players[item.player].name, item, stage_points, previous_race_picks, 0)
+            for item in race_picks
+        ]
+        actual = score_players(self.table, race_picks, players, previous_picks_index(previous_race_picks), 0)
+
+        self.assertEqual([points.model_dump(warnings=False) for points in actual],
+                         [points.model_dump(warnings=False) for points in expected])
+        self.assertTrue(any(points.pick_1_repeated_pick or points.pick_2_repeated_pick or points.pick_3_repeated_pick
+                            for points in actual))
+
+    def test_previous_picks_index(self):
+        index = previous_picks_index(previous_race_picks)
+        self.assertEqual(index['player-chase-billing-9734765941'], frozenset({4030, 4065, 4062}))
+        self.assertEqual(len(index), len({item.player for item in previous_race_picks}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+
+from app.dependencies.sms import RateLimiter, SmsDispatcher
+
+
+class ProviderError(Exception):
+    def __init__(self, status):
+        super().__init__(f'HTTP {status}')
+        self.status = status
+
+
+class StubSms:
+    """Stands in for Twilio: records deliveries, fails numbers listed in ``failures``."""
+
+    def __init__(self, failures=None, delay=0):
+        self.failures = failures or {}
+        self.delay = delay
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, to, body):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            statuses = self.failures.get(to)
+            status = statuses.pop(0) if statuses else None
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+            if status is None:
+                self.sent.append(to)
+        if status is not None:
+            raise ProviderError(status)
+
+
+class TestSmsDispatcher(unittest.TestCase):
+
+    def test_sends_concurrently_and_retries_transient_failures(self):
+        stub = StubSms(failures={'+15555550001': [503, 429], '+15555550002': [400]}, delay=0.05)
+        dispatcher = SmsDispatcher(stub, concurrency=4, rate_per_second=1000, backoff_seconds=0)
+        messages = [(f'+1555555{index:04}', 'Make your picks') for index in range(12)]
+
+        summary = dispatcher.run(messages)
+
+        self.assertEqual((summary.sent, summary.failed, summary.retries), (11, 1, 2))
+        self.assertNotIn('+15555550002', stub.sent)
+        self.assertEqual(summary.errors[0][0], '+15555550002')
+        self.assertEqual(stub.max_in_flight, 4)
+        self.assertEqual(sum(summary.histogram), 11)
+        self.assertIn('sent 11, failed 1, retries 2', str(summary))
+
+    def test_rate_limiter_spaces_calls(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        limiter = RateLimiter(4, clock=lambda: now[0], sleep=sleep)
+        for _ in range(3):
+            limiter.wait()
+        self.assertEqual(waits, [0.25, 0.25])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.dependencies.finalized import FinalizedRaceStore
+from app.dependencies.standings import SeasonStandings
+from app.models.nascar import DriverPoints, LapTimesSummary, StagePoints
+from tests.fixtures import FakeStateClient
+
+results = LapTimesSummary(laps=[], flags=[])
+stage_points = StagePoints(root=[])
+
+
+class TestSeasonStandings(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeStateClient()
+        self.store = FinalizedRaceStore(self.client, 'store')
+        self.standings = SeasonStandings(self.client, 'store', 2024, self.store)
+
+    def race(self, points):
+        return [DriverPoints(player=player, name=player.title(), total_points=total, total_playoff_points=playoff, penalty=penalty)
+                for player, (total, playoff, penalty) in points.items()]
+
+    def test_folds_races_and_replaces_rescored_revisions(self):
+        first = self.store.save(1, self.race({'ann': (90, 5, False), 'bob': (60, 0, True)}), results, stage_points)
+        second = self.store.save(2, self.race({'ann': (40, 0, False), 'cat': (100, 10, False)}), results, stage_points)
+        self.assertTrue(self.standings.fold(first))
+        self.assertTrue(self.standings.fold(second))
+        self.assertFalse(self.standings.fold(second))
+
+        rescored = self.store.save(1, self.race({'ann': (70, 5, False), 'bob': (60, 0, False)}), results, stage_points)
+        self.standings.fold(rescored)
+
+        rows = SeasonStandings(self.client, 'store', 2024, self.store).standings()
+        self.assertEqual([(row.player, row.points, row.playoff_points, row.penalties, row.races) for row in rows],
+                         [('ann', 110, 5, 0, 2), ('cat', 100, 10, 0, 1), ('bob', 60, 0, 0, 1)])
+
+    def test_replicas_fold_different_races_without_losing_either(self):
+        first = self.store.save(1, self.race({'ann': (90, 5, False)}), results, stage_points)
+        second = self.store.save(2, self.race({'bob': (60, 0, False)}), results, stage_points)
+        other_replica = SeasonStandings(self.client, 'store', 2024, FinalizedRaceStore(self.client, 'store'))
+        self.standings.standings()
+        other_replica.standings()
+
+        self.assertTrue(self.standings.fold(first))
+        self.assertTrue(other_replica.fold(second))
+
+        for standings in (self.standings, other_replica):
+            self.assertEqual([(row.player, row.points) for row in standings.standings()], [('ann', 90), ('bob', 60)])
+
+    def test_a_race_whose_fold_failed_is_folded_on_the_next_read(self):
+        self.standings.fold(self.store.save(1, self.race({'ann': (90, 5, False)}), results, stage_points))
+        second = self.store.save(2, self.race({'bob': (60, 0, False)}), results, stage_points)
+        save_state = self.client.save_state
+        self.client.save_state = MagicMock(side_effect=RuntimeError('unavailable'))
+        with self.assertRaises(RuntimeError):
+            self.standings.fold(second)
+        self.client.save_state = save_state
+
+        rows = self.standings.standings([1, 2, 3])
+        self.assertEqual([(row.player, row.points, row.races) for row in rows], [('ann', 90, 1), ('bob', 60, 1)])
+        self.assertFalse(self.standings.fold(second))
+
+    def test_reads_up_to_date_standings_without_loading_snapshots(self):
+        self.standings.fold(self.store.save(1, self.race({'ann': (90, 5, False)}), results, stage_points))
+        self.standings.fold(self.store.save(2, self.race({'bob': (60, 0, False)}), results, stage_points))
+        self.client.get_bulk_state = MagicMock(side_effect=AssertionError('loaded snapshots'))
+
+        rows = self.standings.standings([1, 2, 3])
+        self.assertEqual([(row.player, row.points) for row in rows], [('ann', 90), ('bob', 60)])
+
+    def test_rebuilds_when_a_revision_was_skipped(self):
+        self.standings.fold(self.store.save(1, self.race({'ann': (90, 5, False), 'bob': (60, 0, False)}), results, stage_points))
+        self.store.save(1, self.race({'ann': (80, 5, False), 'bob': (60, 0, False)}), results, stage_points)
+        third = self.store.save(1, self.race({'ann': (70, 5, False)}), results, stage_points)
+        self.assertTrue(self.standings.fold(third))
+
+        rows = self.standings.standings()
+        self.assertEqual([(row.player, row.points, row.races) for row in rows], [('ann', 70, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()